@@ -0,0 +1,184 @@
+"""
+All-pass sections: phase equalization and a parametric candidate library.
+
+An all-pass section with pole p has its zero at 1/conj(p) and adds
+(1 - |p|^2) / |e^jw - p|^2 samples of group delay at w, so a cascade of
+sections can flatten the group delay of a design over its passband without
+touching the magnitude response.
+"""
+from collections import namedtuple
+
+import numpy as np
+from scipy.optimize import minimize
+
+from frequency_response import zpk_group_delay
+
+AllPassResult = namedtuple("AllPassResult", [
+    "zeros", "poles", "w", "delay_before", "delay_after", "variation_before", "variation_after",
+])
+AllPassResult.__doc__ = """Equalizer roots plus the passband group delay before/after (peak-to-peak variation in samples)."""
+
+
+def allpass_roots(poles):
+    """Zeros of the all-pass sections with the given poles (mirrored in the unit circle)."""
+    poles = np.asarray(poles, dtype=complex)
+    return 1 / np.conj(poles)
+
+
+def allpass_gain(poles):
+    """
+    Gain that keeps sections with these poles (and zeros at 1/conj(p)) at unit
+    magnitude: each such pole/zero pair scales the response by 1/|p|.
+    """
+    return float(np.prod(np.abs(np.asarray(poles, dtype=complex))))
+
+
+def section_delay(radius, angle, w):
+    """
+    Group delay of poles r e^(j theta) for arrays of sections, with its
+    derivatives w.r.t. r and theta. ``radius``/``angle`` are (n,), the results
+    (n, F). A negative radius is a real pole on the negative axis.
+    """
+    r = np.asarray(radius, dtype=float)[:, np.newaxis]
+    theta = np.asarray(angle, dtype=float)[:, np.newaxis]
+    c, s = np.cos(w - theta), np.sin(w - theta)
+    den = 1 - 2 * r * c + r * r
+    delay = (1 - r * r) / den
+    d_radius = (-2 * r * den + 2 * (1 - r * r) * (c - r)) / den ** 2
+    d_angle = 2 * r * (1 - r * r) * s / den ** 2
+    return delay, d_radius, d_angle
+
+
+def unpack(x, first_order, max_radius):
+    """Map unconstrained parameters to real poles and (radius, angle) of the complex pairs."""
+    real_poles = max_radius * np.tanh(x[:first_order])
+    u, v = x[first_order::2], x[first_order + 1::2]
+    radius = max_radius / (1 + np.exp(-u))
+    angle = np.pi / (1 + np.exp(-v))
+    return real_poles, radius, angle
+
+
+def equalizer_delay(x, first_order, max_radius, w):
+    """Total delay of the cascade and its gradient (len(x), F) w.r.t. the raw parameters."""
+    real_poles, radius, angle = unpack(x, first_order, max_radius)
+    gradient = np.zeros((len(x), w.size))
+    total = np.zeros(w.size)
+
+    if first_order:
+        delay, d_radius, _ = section_delay(real_poles, np.zeros(first_order), w)
+        total += delay.sum(axis=0)
+        # d tanh(u) / du = 1 - tanh^2
+        gradient[:first_order] = d_radius * (max_radius * (1 - np.tanh(x[:first_order]) ** 2))[:, np.newaxis]
+
+    if radius.size:
+        # A conjugate pair is the sum of the sections at +theta and -theta
+        upper, d_radius_upper, d_angle_upper = section_delay(radius, angle, w)
+        lower, d_radius_lower, d_angle_lower = section_delay(radius, -angle, w)
+        total += (upper + lower).sum(axis=0)
+        d_u = radius * (1 - radius / max_radius)
+        d_v = angle * (1 - angle / np.pi)
+        gradient[first_order::2] = (d_radius_upper + d_radius_lower) * d_u[:, np.newaxis]
+        gradient[first_order + 1::2] = (d_angle_upper - d_angle_lower) * d_v[:, np.newaxis]
+    return total, gradient
+
+
+def optimize_allpass(zeros, poles, passband, second_order=2, first_order=0, points=512,
+                     max_radius=0.98, restarts=4, seed=0):
+    """
+    Fit a cascade of all-pass sections that minimizes the group delay variation
+    of the design (zeros, poles) over ``passband`` = (low, high) in normalized
+    frequency (x pi rad/sample).
+
+    The cost is the mean squared deviation of the total group delay from its
+    mean over the passband grid; its gradient is evaluated analytically for all
+    sections and frequencies at once and fed to L-BFGS-B. A few random restarts
+    guard against poor local minima. Returns an AllPassResult.
+    """
+    low, high = passband
+    w = np.linspace(low * np.pi, high * np.pi, points)
+    base_delay = zpk_group_delay(zeros, poles, w)
+    rng = np.random.default_rng(seed)
+
+    def cost(x):
+        delay, gradient = equalizer_delay(x, first_order, max_radius, w)
+        error = base_delay + delay
+        error = error - error.mean()
+        return np.mean(error ** 2), 2 * gradient @ error / w.size
+
+    best = None
+    for _ in range(max(restarts, 1)):
+        x0 = np.empty(first_order + 2 * second_order)
+        x0[:first_order] = rng.uniform(-1, 1, first_order)
+        # Start the complex pairs at moderate radii with angles spread over the passband
+        x0[first_order::2] = rng.uniform(0.5, 2.0, second_order)
+        centers = np.clip(np.linspace(low, high, second_order + 2)[1:-1] + rng.normal(0, 0.02, second_order),
+                          1e-3, 1 - 1e-3)
+        x0[first_order + 1::2] = np.log(centers / (1 - centers))
+        result = minimize(cost, x0, jac=True, method="L-BFGS-B")
+        if best is None or result.fun < best.fun:
+            best = result
+
+    real_poles, radius, angle = unpack(best.x, first_order, max_radius)
+    pair_poles = radius * np.exp(1j * angle)
+    eq_poles = np.concatenate([real_poles.astype(complex), pair_poles, np.conj(pair_poles)])
+    delay_after = base_delay + equalizer_delay(best.x, first_order, max_radius, w)[0]
+    return AllPassResult(
+        zeros=allpass_roots(eq_poles),
+        poles=eq_poles,
+        w=w,
+        delay_before=base_delay,
+        delay_after=delay_after,
+        variation_before=float(np.ptp(base_delay)),
+        variation_after=float(np.ptp(delay_after)),
+    )
+
+
+AllPassLibrary = namedtuple("AllPassLibrary", ["labels", "poles", "w", "phase", "delay"])
+AllPassLibrary.__doc__ = """Parametric all-pass candidates with their phase and group delay, one row per candidate."""
+
+
+def parametric_allpass_library(real_poles=None, radii=None, angles=None, points=512):
+    """
+    Build the candidate grid (first-order sections over ``real_poles`` plus
+    conjugate pairs over radii x angles) and evaluate the unwrapped phase and
+    group delay of every candidate in one broadcasted (candidates, 2, F) pass.
+
+    With pole p = r e^(j theta) a section contributes
+    phase  -w - 2 atan2(r sin(w - theta), 1 - r cos(w - theta))
+    delay  (1 - r^2) / (1 - 2 r cos(w - theta) + r^2)
+    which is continuous, so no unwrapping is needed.
+    """
+    if real_poles is None:
+        # A pole at the origin would put its zero at infinity, so the grid skips it
+        real_poles = np.concatenate([-np.linspace(0.9, 0.1, 9), np.linspace(0.1, 0.9, 9)])
+    real_poles = np.asarray(real_poles, dtype=float)
+    radii = np.linspace(0.3, 0.95, 14) if radii is None else np.asarray(radii, dtype=float)
+    angles = np.linspace(0.05, 0.95, 16) * np.pi if angles is None else np.asarray(angles, dtype=float)
+
+    pair_radius, pair_angle = [grid.ravel() for grid in np.meshgrid(radii, angles, indexing="ij")]
+    count = real_poles.size + pair_radius.size
+
+    # Two pole slots per candidate; first-order candidates leave the second slot unused
+    radius = np.zeros((count, 2))
+    angle = np.zeros((count, 2))
+    used = np.zeros((count, 2))
+    radius[:real_poles.size, 0] = real_poles
+    used[:real_poles.size, 0] = 1
+    radius[real_poles.size:] = pair_radius[:, np.newaxis]
+    angle[real_poles.size:, 0] = pair_angle
+    angle[real_poles.size:, 1] = -pair_angle
+    used[real_poles.size:] = 1
+
+    w = np.linspace(0, np.pi, points)
+    r, theta, used = radius[..., np.newaxis], angle[..., np.newaxis], used[..., np.newaxis]
+    c, s = np.cos(w - theta), np.sin(w - theta)
+    delay = np.sum(used * (1 - r * r) / (1 - 2 * r * c + r * r), axis=1)
+    phase = np.sum(used * (-w - 2 * np.arctan2(r * s, 1 - r * c)), axis=1)
+
+    labels = [f"First-order, real pole at {a:.2f}" for a in real_poles] + [
+        f"Second-order, poles {r_:.2f}∠±{t / np.pi:.2f}π" for r_, t in zip(pair_radius, pair_angle)
+    ]
+    poles = [np.array([a], dtype=complex) for a in real_poles] + [
+        np.array([r_ * np.exp(1j * t), r_ * np.exp(-1j * t)]) for r_, t in zip(pair_radius, pair_angle)
+    ]
+    return AllPassLibrary(labels, poles, w, phase, delay)
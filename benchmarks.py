@@ -0,0 +1,198 @@
+"""
+Benchmark suite for the DSP and rendering hot paths of the app.
+
+Covers every realization of the real-time filtering, built by
+realizations.make_engine as in the app, point by point (the
+process_next_point path) and in blocks, compute_filter_coefficients, the frequency/phase response
+updates, library designs through load_predefined_filter (cold and cached)
+and an offscreen redraw of every canvas. Filtering runs on data/*.csv plus
+long synthetic signals. Runs are appended to a JSON file and compared with
+the previous run.
+
+    python benchmarks.py [results.json] [signal length]
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+
+# Must be set before Qt is imported
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+from scipy import signal
+
+from c_benchmark import benchmark_signals, library_benchmarks, load_results, save_results
+from c_codegen import generate_fir_c, generate_parallel_c, generate_sos_c
+from native_filter import NativeFilter
+from realizations import ENGINE_NAMES, design_parallel, is_fir, make_engine, measure_fft_crossover
+
+RESULTS_FILE = "benchmark_results.json"
+# The point-by-point path only runs on the start of every signal
+PER_SAMPLE_POINTS = 2000
+# Block runs of slow engines (the pure-Python lattice) are cut to about this many seconds
+MAX_BLOCK_SECONDS = 1.0
+
+
+def time_call(function, min_time=0.1):
+    """Best-of seconds per call of ``function()``, repeating it until ``min_time`` seconds have been spent."""
+    best = np.inf
+    spent = 0.0
+    while spent < min_time:
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        spent += elapsed
+    return best
+
+
+def row(benchmark, case, seconds, count=1, unit="ms"):
+    """Result row; ``seconds`` for ``count`` items, reported per item in ``unit`` ("ms" or "us")."""
+    scale = {"ms": 1e3, "us": 1e6}[unit]
+    return {"benchmark": benchmark, "case": case, "value": seconds / count * scale,
+            "unit": f"{unit}/sample" if count > 1 else unit}
+
+
+class LfilterPath:
+    """
+    The plain Direct Form II path of process_next_point (make_engine gives no
+    engine for it): one lfilter call per point, carrying the filter state.
+    """
+
+    def __init__(self, b, a):
+        self.b, self.a = b, a
+        self.reset()
+
+    def reset(self, initial=0.0):
+        self.state = signal.lfilter_zi(self.b, self.a) * initial
+
+    def process(self, x):
+        y, self.state = signal.lfilter(self.b, self.a, x, zi=self.state)
+        return y
+
+
+def native_builder(zpk, b, a):
+    """Native C engines of the library design, from the same generators as "Generate C Code"."""
+    def build(structure):
+        if structure == "Parallel":
+            return NativeFilter(generate_parallel_c(*design_parallel(b, a, zpk)))
+        return NativeFilter(generate_fir_c(b) if is_fir(a) else generate_sos_c(signal.zpk2sos(*zpk)))
+    return build
+
+
+def filtering_benchmarks(signals, min_time=0.1):
+    """Point-by-point and block filtering of every signal, per library design and engine."""
+    rows = []
+    fft_crossover = measure_fft_crossover()
+    for label, zpk, (b, a) in library_benchmarks():
+        for engine_name in ENGINE_NAMES:
+            try:
+                engine = make_engine(engine_name, b, a, zpk, fft_crossover, native_builder(zpk, b, a))
+            except (ValueError, RuntimeError) as e:
+                print(f"{label} {engine_name} skipped: {e}")
+                continue
+            if engine is None:
+                engine = LfilterPath(b, a)
+            for signal_name, x in signals.items():
+                points = x[:PER_SAMPLE_POINTS]
+
+                def per_sample():
+                    for point in points:
+                        engine.process([point])
+
+                engine.reset()
+                seconds = time_call(per_sample, min_time)
+                rows.append(row(f"{label} {engine_name} per-sample", signal_name, seconds, len(points), "us"))
+                block = x[:max(len(points), int(MAX_BLOCK_SECONDS * len(points) / seconds))]
+                engine.reset()
+                rows.append(row(f"{label} {engine_name} block", signal_name,
+                                time_call(lambda: engine.process(block), min_time), len(block), "us"))
+            if isinstance(engine, NativeFilter):
+                engine.close()
+    return rows
+
+
+def app_benchmarks(signal, min_time=0.1):
+    """GUI-side hot paths on an offscreen FilterDesignApp, for every library entry."""
+    from PyQt5.QtWidgets import QApplication
+    from filter_library import LIBRARY_ENTRIES, DesignCache
+    from main import FilterDesignApp
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    rows = []
+    # The app prints the coefficients on every update
+    with contextlib.redirect_stdout(io.StringIO()):
+        window = FilterDesignApp()
+        window.resize(1600, 1000)
+        window.signal = signal
+        window.x_values = np.arange(len(signal)) / 100.0
+        window.filtered_signal = np.zeros_like(signal)
+        for index, entry in enumerate(LIBRARY_ENTRIES):
+            window.filter_library_combobox.setCurrentIndex(index)
+            window.design_cache = DesignCache(maxsize=256)
+            start = time.perf_counter()
+            window.load_predefined_filter()
+            rows.append(row("load_predefined_filter (cold)", entry, time.perf_counter() - start))
+            rows.append(row("load_predefined_filter (cached)", entry,
+                            time_call(window.load_predefined_filter, min_time)))
+            rows.append(row("compute_filter_coefficients", entry,
+                            time_call(window.compute_filter_coefficients, min_time)))
+            rows.append(row("plot_frequency_response", entry, time_call(window.plot_frequency_response, min_time)))
+            rows.append(row("plot_phase_response", entry, time_call(window.plot_phase_response, min_time)))
+
+        # Redraw with the last design on the plane and a full window of the signal plots
+        window.index = min(len(signal), 2000)
+        window.filtered_signal[:window.index] = signal[:window.index]
+        window.update_plots()
+        canvases = {"z_plane": window.z_plane_canvas, "frequency_response": window.freq_response_canvas,
+                    "phase_response": window.phase_response_canvas, "group_delay": window.group_delay_canvas,
+                    "mouse_input": window.mouse_input_canvas, "original": window.original_canvas,
+                    "filtered": window.filtered_canvas}
+        for name, canvas in canvases.items():
+            rows.append(row("canvas redraw", name, time_call(canvas.draw, min_time)))
+        rows.append(row("update_plots", f"{window.index} points", time_call(window.update_plots, min_time)))
+        window.close()
+    app.processEvents()
+    return rows
+
+
+def compare_runs(previous, current, slowdown=1.3):
+    """Rows of ``current`` more than ``slowdown`` x slower than the same benchmark and case in ``previous``."""
+    before = {(entry["benchmark"], entry["case"]): entry for entry in previous}
+    messages = []
+    for entry in current:
+        old = before.get((entry["benchmark"], entry["case"]))
+        if old is not None and entry["value"] > slowdown * old["value"]:
+            messages.append(f"{entry['benchmark']} on {entry['case']}: {old['value']:.3g} -> "
+                            f"{entry['value']:.3g} {entry['unit']}")
+    return messages
+
+
+def format_rows(rows):
+    width = max([len("benchmark")] + [len(entry["benchmark"]) for entry in rows])
+    case_width = max([len("case")] + [len(entry["case"]) for entry in rows])
+    lines = [f"{'benchmark':<{width}} {'case':<{case_width}} {'value':>10} unit"]
+    for entry in rows:
+        lines.append(f"{entry['benchmark']:<{width}} {entry['case']:<{case_width}} {entry['value']:>10.3g} "
+                     f"{entry['unit']}")
+    return "\n".join(lines)
+
+
+def main(results_path=RESULTS_FILE, length=100000):
+    signals = benchmark_signals(int(length))
+    rows = filtering_benchmarks(signals)
+    rows += app_benchmarks(next(iter(signals.values())))
+    print(format_rows(rows))
+
+    previous = load_results(results_path)
+    if previous:
+        regressions = compare_runs(previous[-1]["rows"], rows)
+        print("\n".join(["", "Regressions against the last run:"] + regressions) if regressions
+              else "\nNo regressions against the last run.")
+    save_results(rows, results_path)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3])
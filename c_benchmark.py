@@ -0,0 +1,193 @@
+"""
+Compile-and-benchmark harness for the generated C filters.
+
+A generated source is compiled into a shared library with the local C
+compiler (see native_filter.NativeFilter), loaded through ctypes and run on the
+recordings in data/*.csv plus a few synthetic signals. Every run reports the
+max error against the SciPy reference and the throughput in ns/sample, and
+runs are appended to a JSON file so a new run can be compared with the last.
+
+    python c_benchmark.py [results.json]
+"""
+import glob
+import json
+import os
+import sys
+import time
+
+import numpy as np
+from scipy import signal
+
+from c_codegen import (
+    C_TYPES, generate_fir_c, generate_fixed_fir_c, generate_fixed_sos_c, generate_parallel_c, generate_sos_c
+)
+from fixed_point import FORMATS
+from native_filter import NativeFilter
+
+DATA_PATTERN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "*.csv")
+RESULTS_FILE = "c_benchmark_results.json"
+# Integer (Q15/Q31) builds get every signal normalized to this peak, in full-scale units
+FIXED_POINT_PEAK = 0.25
+
+
+def benchmark_signals(length=100000, seed=0, pattern=DATA_PATTERN):
+    """The recordings matching ``pattern`` (second CSV column) plus synthetic test signals."""
+    signals = {}
+    for path in sorted(glob.glob(pattern)):
+        data = np.loadtxt(path, delimiter=",")
+        signals[os.path.splitext(os.path.basename(path))[0]] = data[:, 1] if data.ndim > 1 else data
+    n = np.arange(length)
+    signals["impulse"] = (n == 0).astype(float)
+    signals["step"] = np.ones(length)
+    signals["white_noise"] = np.random.default_rng(seed).standard_normal(length)
+    signals["chirp"] = signal.chirp(n, f0=0.0, t1=length, f1=0.5)
+    signals["sines"] = np.sin(0.01 * np.pi * n) + 0.5 * np.sin(0.3 * np.pi * n)
+    return signals
+
+
+def time_per_sample(compiled, x, min_time=0.1):
+    """Best-of ns/sample, repeating the block call until ``min_time`` seconds have been spent."""
+    x = np.ascontiguousarray(x, dtype=compiled.dtype)
+    y = np.empty_like(x)
+    best = np.inf
+    spent = 0.0
+    while spent < min_time:
+        start = time.perf_counter()
+        compiled.process_block(x.ctypes.data, y.ctypes.data, len(x), compiled.state.ctypes.data)
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        spent += elapsed
+    return best / len(x) * 1e9
+
+
+def benchmark_c_code(source, reference, ctype="double", label="filter", signals=None, name="filter"):
+    """
+    Compile ``source`` and run it on every signal. ``reference(x)`` is the
+    SciPy output in double precision. Returns one dict row per signal.
+    Integer builds are checked on the signals normalized to FIXED_POINT_PEAK.
+    """
+    signals = benchmark_signals() if signals is None else signals
+    compiled = NativeFilter(source, ctype, name)
+    rows = []
+    try:
+        for signal_name, x in signals.items():
+            x = np.asarray(x, dtype=float)
+            if compiled.full_scale is not None:
+                x = compiled.encode(x * FIXED_POINT_PEAK / (np.max(np.abs(x)) or 1.0))
+            compiled.reset()
+            y = compiled.decode(compiled.process(x))
+            expected = reference(compiled.decode(np.asarray(x, dtype=float)))
+            error = float(np.max(np.abs(y - expected)))
+            scale = float(np.max(np.abs(expected))) or 1.0
+            compiled.reset()
+            rows.append({
+                "label": label, "ctype": ctype, "signal": signal_name, "samples": len(x),
+                "max_error": error, "relative_error": error / scale,
+                "ns_per_sample": time_per_sample(compiled, x),
+            })
+    finally:
+        compiled.close()
+    return rows
+
+
+def load_results(path=RESULTS_FILE):
+    if not os.path.exists(path):
+        return []
+    with open(path) as file:
+        return json.load(file)
+
+
+def save_results(rows, path=RESULTS_FILE):
+    """Append a run (timestamp + rows) to the results file."""
+    runs = load_results(path)
+    runs.append({"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "rows": rows})
+    with open(path, "w") as file:
+        json.dump(runs, file, indent=1)
+
+
+def compare_results(previous, current, slowdown=1.3, error_growth=10.0):
+    """
+    Regressions of ``current`` against ``previous`` rows with the same label,
+    precision and signal: ns/sample up by more than ``slowdown`` x, or the
+    relative error up by more than ``error_growth`` x (ignoring changes below
+    double round-off).
+    """
+    before = {(row["label"], row["ctype"], row["signal"]): row for row in previous}
+    messages = []
+    for row in current:
+        old = before.get((row["label"], row["ctype"], row["signal"]))
+        if old is None:
+            continue
+        name = f"{row['label']} ({row['ctype']}) on {row['signal']}"
+        if row["ns_per_sample"] > slowdown * old["ns_per_sample"]:
+            messages.append(f"{name}: {old['ns_per_sample']:.2f} -> {row['ns_per_sample']:.2f} ns/sample")
+        if row["relative_error"] > max(error_growth * old["relative_error"], 1e-15):
+            messages.append(f"{name}: relative error {old['relative_error']:.2e} -> {row['relative_error']:.2e}")
+    return messages
+
+
+def format_rows(rows):
+    width = max([len("label")] + [len(row["label"]) for row in rows])
+    lines = [f"{'label':<{width}} {'type':<7} {'signal':<14} {'max error':>10} {'rel error':>10} {'ns/sample':>10}"]
+    for row in rows:
+        lines.append(f"{row['label']:<{width}} {row['ctype']:<7} {row['signal']:<14} {row['max_error']:>10.2e} "
+                     f"{row['relative_error']:>10.2e} {row['ns_per_sample']:>10.2f}")
+    return "\n".join(lines)
+
+
+def library_benchmarks():
+    """(label, (zeros, poles, gain), (b, a)) of a few library designs covering IIR and FIR."""
+    from filter_library import design_filter, fir_zeros
+    from realizations import normalize_tf
+
+    designs = []
+    for family, band_type, order, cutoff, ripple in [("Elliptic", "LPF", 8, 0.2, 1),
+                                                     ("Butterworth", "BPF", 4, 0.3, None),
+                                                     ("Parks-McClellan FIR", "LPF", 4, 0.2, None)]:
+        design = design_filter(family, band_type, order, cutoff, ripple)
+        if design.taps is not None:
+            zpk = fir_zeros(design.taps), design.poles, design.gain
+            b, a = design.taps, np.array([1.0])
+        else:
+            zpk = design.zeros, design.poles, design.gain
+            b, a = normalize_tf(*signal.zpk2tf(*zpk))
+        designs.append((f"{family} {band_type} {order}", zpk, (b, a)))
+    return designs
+
+
+def main(results_path=RESULTS_FILE):
+    from realizations import design_parallel
+
+    signals = benchmark_signals()
+    rows = []
+    for label, zpk, (b, a) in library_benchmarks():
+        sos = signal.zpk2sos(*zpk)
+        reference = (lambda x, b=b: np.convolve(x, b)[:len(x)]) if len(a) == 1 else (
+            lambda x, sos=sos: signal.sosfilt(sos, x))
+        sections, fir = design_parallel(b, a, zpk)
+        for ctype in C_TYPES:
+            if len(a) == 1:
+                rows += benchmark_c_code(generate_fir_c(b, ctype), reference, ctype, f"{label} direct form", signals)
+            else:
+                rows += benchmark_c_code(generate_sos_c(sos, ctype), reference, ctype, f"{label} cascade", signals)
+            rows += benchmark_c_code(generate_parallel_c(sections, fir, ctype), reference, ctype,
+                                     f"{label} parallel", signals)
+        for fmt_name in FORMATS:
+            if len(a) == 1:
+                rows += benchmark_c_code(generate_fixed_fir_c(b, fmt_name), reference, fmt_name,
+                                         f"{label} direct form", signals)
+            else:
+                rows += benchmark_c_code(generate_fixed_sos_c(sos, fmt_name), reference, fmt_name,
+                                         f"{label} cascade", signals)
+    print(format_rows(rows))
+
+    previous = load_results(results_path)
+    if previous:
+        regressions = compare_results(previous[-1]["rows"], rows)
+        print("\n".join(["", "Regressions against the last run:"] + regressions) if regressions
+              else "\nNo regressions against the last run.")
+    save_results(rows, results_path)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:2])
@@ -0,0 +1,427 @@
+"""
+C code generation for the cascade (SOS) and parallel realizations and
+direct form FIRs, in floating point or (cascade and FIR only) Q15/Q31
+integer arithmetic.
+
+The generated files have no globals: every filter instance owns a state
+struct, and samples go through ``<name>_process_block`` a block at a time.
+Coefficients are printed with the shortest representation that round-trips
+to the exact float/double value.
+"""
+import numpy as np
+
+from fixed_point import FORMATS, cascade_norms, coefficient_bits, order_sections
+
+C_TYPES = {"double": np.float64, "float": np.float32}
+# Sample dtype of every precision the generator emits, the integer ones being FORMATS
+SAMPLE_DTYPES = {**C_TYPES, **{name: np.dtype(f"int{fmt.word_bits}").type for name, fmt in FORMATS.items()}}
+
+
+def format_coefficient(value, ctype="double"):
+    """Shortest literal that parses back to exactly the same ``ctype`` value."""
+    text = np.format_float_scientific(C_TYPES[ctype](value), unique=True, trim='0')
+    return text + "f" if ctype == "float" else text
+
+
+def format_array(values, ctype="double", indent="    ", per_line=4):
+    values = [format_coefficient(value, ctype) for value in np.ravel(values)]
+    lines = [", ".join(values[i:i + per_line]) for i in range(0, len(values), per_line)]
+    return (",\n" + indent).join(lines)
+
+
+def c_header(name, ctype, structure, details, includes=""):
+    lines = "\n".join(f" * {line}" for line in details)
+    return f"""/**
+ * Auto-generated digital filter implementation
+ * Structure: {structure}
+ * Precision: {ctype}
+{lines}
+ *
+ * Usage:
+ *     {name}_state state;
+ *     {name}_reset(&state);
+ *     {name}_process_block(in, out, n, &state);
+ * {name}_state_size() lets callers without the header (e.g. ctypes) allocate the state.
+ */
+
+#include <stddef.h>
+#include <string.h>{includes}
+"""
+
+
+def c_test_main(name, ctype, impulse="1", scale=""):
+    return f"""
+#ifdef FILTER_TEST
+#include <stdio.h>
+
+int main(void) {{
+    /* Impulse response */
+    {ctype} in[8] = {{{impulse}}};
+    {ctype} out[8];
+    {name}_state state;
+
+    {name}_reset(&state);
+    {name}_process_block(in, out, 8, &state);
+    for (int i = 0; i < 8; i++) {{
+        printf("%d -> %.9g\\n", i, (double)out[i]{scale});
+    }}
+    return 0;
+}}
+#endif
+"""
+
+
+def generate_sos_c(sos, ctype="double", name="filter", details=()):
+    """
+    C source of a cascade of biquads (transposed direct form II per section).
+
+    ``process_block`` runs the whole block through one section before the
+    next, so each section's coefficients and state stay in registers for the
+    inner loop; the first section reads ``in`` and the rest work in place on
+    ``out``.
+    """
+    sos = np.atleast_2d(np.asarray(sos, dtype=float))
+    # zpk2sos/tf2sos already give a0 == 1, but don't rely on it
+    sos = sos / sos[:, 3:4]
+    sections = len(sos)
+    upper = name.upper()
+    rows = ",\n".join(f"    {{{format_array(row[[0, 1, 2, 4, 5]], ctype, per_line=5)}}}" for row in sos)
+    return c_header(name, ctype, "Cascade of second-order sections (transposed Direct Form II)",
+                    [f"Sections: {sections}", *details]) + f"""
+#define {upper}_SECTIONS {sections}
+
+/* One row per section: b0, b1, b2, a1, a2 (a0 == 1) */
+static const {ctype} {name}_coeffs[{upper}_SECTIONS][5] = {{
+{rows}
+}};
+
+typedef struct {{
+    {ctype} s[{upper}_SECTIONS][2];
+}} {name}_state;
+
+void {name}_reset({name}_state *state) {{
+    memset(state, 0, sizeof(*state));
+}}
+
+size_t {name}_state_size(void) {{
+    return sizeof({name}_state);
+}}
+
+void {name}_process_block(const {ctype} *restrict in, {ctype} *restrict out, size_t n, {name}_state *state) {{
+    const {ctype} *src = in;
+    for (int k = 0; k < {upper}_SECTIONS; k++) {{
+        const {ctype} b0 = {name}_coeffs[k][0], b1 = {name}_coeffs[k][1], b2 = {name}_coeffs[k][2];
+        const {ctype} a1 = {name}_coeffs[k][3], a2 = {name}_coeffs[k][4];
+        {ctype} s1 = state->s[k][0], s2 = state->s[k][1];
+        for (size_t i = 0; i < n; i++) {{
+            const {ctype} x = src[i];
+            const {ctype} y = b0 * x + s1;
+            s1 = b1 * x - a1 * y + s2;
+            s2 = b2 * x - a2 * y;
+            out[i] = y;
+        }}
+        state->s[k][0] = s1;
+        state->s[k][1] = s2;
+        src = out;
+    }}
+}}
+""" + c_test_main(name, ctype)
+
+
+def generate_fir_c(taps, ctype="double", name="filter", details=()):
+    """
+    C source of a direct form FIR from its taps.
+
+    Expanding a long FIR into biquads goes through the roots of the taps,
+    which loses far more precision than the direct form. ``process_block``
+    takes each output's inputs from the block itself where it can, so only the
+    first TAPS - 1 outputs read the history, which is updated once per block
+    (it holds TAPS inputs, so a single tap still has a state array).
+    """
+    taps = np.atleast_1d(np.asarray(taps, dtype=float))
+    count = len(taps)
+    upper = name.upper()
+    return c_header(name, ctype, "Direct form FIR", [f"Taps: {count}", *details]) + f"""
+#define {upper}_TAPS {count}
+
+static const {ctype} {name}_taps[{upper}_TAPS] = {{
+    {format_array(taps, ctype)}
+}};
+
+typedef struct {{
+    {ctype} x[{upper}_TAPS];  /* x[n-1], x[n-2], ... at the end of the last block (the last one unused) */
+}} {name}_state;
+
+void {name}_reset({name}_state *state) {{
+    memset(state, 0, sizeof(*state));
+}}
+
+size_t {name}_state_size(void) {{
+    return sizeof({name}_state);
+}}
+
+void {name}_process_block(const {ctype} *restrict in, {ctype} *restrict out, size_t n, {name}_state *state) {{
+    for (size_t i = 0; i < n; i++) {{
+        const size_t direct = i + 1 < {upper}_TAPS ? i + 1 : {upper}_TAPS;
+        {ctype} y = 0;
+        for (size_t j = 0; j < direct; j++) {{
+            y += {name}_taps[j] * in[i - j];
+        }}
+        for (size_t j = direct; j < {upper}_TAPS; j++) {{
+            y += {name}_taps[j] * state->x[j - i - 1];
+        }}
+        out[i] = y;
+    }}
+    const size_t kept = n < {upper}_TAPS ? n : {upper}_TAPS;
+    memmove(state->x + kept, state->x, ({upper}_TAPS - kept) * sizeof(state->x[0]));
+    for (size_t j = 0; j < kept; j++) {{
+        state->x[j] = in[n - 1 - j];
+    }}
+}}
+""" + c_test_main(name, ctype)
+
+
+def generate_parallel_c(sections, fir, ctype="double", name="filter", details=()):
+    """
+    C source of the parallel form (sections from realizations.zpk2parallel or tf2parallel).
+
+    The section coefficients and states are stored as one array per term, so
+    the per-sample loop over the independent sections is a straight
+    vectorizable loop.
+    """
+    sections = np.atleast_2d(np.asarray(sections, dtype=float)).reshape(-1, 5)
+    fir = np.atleast_1d(np.asarray(fir, dtype=float))
+    # C has no empty arrays: a pure FIR gets one silent section
+    if len(sections) == 0:
+        sections = np.array([[0.0, 0.0, 1.0, 0.0, 0.0]])
+    fir = fir if len(fir) else np.zeros(1)
+    count, taps = len(sections), len(fir)
+    upper = name.upper()
+    history = fir_loop = fir_update = ""
+    if taps > 1:
+        history = f"\n    {ctype} fir[{upper}_FIR_TAPS - 1];"
+        fir_loop = f"""
+        for (int j = 1; j < {upper}_FIR_TAPS; j++) {{
+            y += {name}_fir[j] * state->fir[j - 1];
+        }}"""
+        fir_update = "\n        state->fir[0] = x;"
+    if taps > 2:
+        fir_update = f"""
+        memmove(state->fir + 1, state->fir, ({upper}_FIR_TAPS - 2) * sizeof(state->fir[0]));""" + fir_update
+    return c_header(name, ctype, "Parallel sections plus FIR part",
+                    [f"Sections: {count}", f"FIR taps: {taps}", *details]) + f"""
+#define {upper}_SECTIONS {count}
+#define {upper}_FIR_TAPS {taps}
+
+/* Section k: (b0[k] + b1[k] z^-1) / (1 + a1[k] z^-1 + a2[k] z^-2) */
+static const {ctype} {name}_b0[{upper}_SECTIONS] = {{{format_array(sections[:, 0], ctype)}}};
+static const {ctype} {name}_b1[{upper}_SECTIONS] = {{{format_array(sections[:, 1], ctype)}}};
+static const {ctype} {name}_a1[{upper}_SECTIONS] = {{{format_array(sections[:, 3], ctype)}}};
+static const {ctype} {name}_a2[{upper}_SECTIONS] = {{{format_array(sections[:, 4], ctype)}}};
+static const {ctype} {name}_fir[{upper}_FIR_TAPS] = {{{format_array(fir, ctype)}}};
+
+typedef struct {{
+    {ctype} s1[{upper}_SECTIONS];
+    {ctype} s2[{upper}_SECTIONS];{history}
+}} {name}_state;
+
+void {name}_reset({name}_state *state) {{
+    memset(state, 0, sizeof(*state));
+}}
+
+size_t {name}_state_size(void) {{
+    return sizeof({name}_state);
+}}
+
+void {name}_process_block(const {ctype} *restrict in, {ctype} *restrict out, size_t n, {name}_state *state) {{
+    for (size_t i = 0; i < n; i++) {{
+        const {ctype} x = in[i];
+        {ctype} y = {name}_fir[0] * x;{fir_loop}
+        for (int k = 0; k < {upper}_SECTIONS; k++) {{
+            const {ctype} v = {name}_b0[k] * x + state->s1[k];
+            state->s1[k] = {name}_b1[k] * x - {name}_a1[k] * v + state->s2[k];
+            state->s2[k] = -{name}_a2[k] * v;
+            y += v;
+        }}{fir_update}
+        out[i] = y;
+    }}
+}}
+""" + c_test_main(name, ctype)
+
+
+def fixed_point_coefficients(values, fmt):
+    """
+    Integer coefficients and shift of one multiply-accumulate: the most
+    fractional bits the largest coefficient allows, minus guard bits so the
+    accumulator cannot overflow on any input within full scale.
+    """
+    limit = 2.0 ** (fmt.accumulator_bits - 1)
+    full_scale = 2.0 ** (fmt.word_bits - 1)
+    shift = coefficient_bits(values, fmt.word_bits)
+    while shift > 0:
+        integers = np.round(values * 2.0 ** shift)
+        if (np.max(np.abs(integers)) < full_scale
+                and np.sum(np.abs(integers)) * full_scale + 2.0 ** (shift - 1) < limit):
+            return integers.astype(np.int64), shift
+        shift -= 1
+    raise ValueError(f"Coefficients too large for {fmt.word_bits}-bit words: {values}")
+
+
+def fixed_point_sections(sos, fmt):
+    """Integer coefficients and shift of every section (see fixed_point_coefficients)."""
+    coefficients, shifts = [], []
+    for row in sos:
+        integers, shift = fixed_point_coefficients(row[[0, 1, 2, 4, 5]], fmt)
+        coefficients.append(integers)
+        shifts.append(shift)
+    return np.array(coefficients), shifts
+
+
+def generate_fixed_sos_c(sos, fmt_name="Q15", name="filter", details=(), norm="l1"):
+    """
+    Integer-only C source of a cascade of biquads for targets without an FPU.
+
+    Sections are reordered for the least roundoff noise and scaled so no
+    section output but the last can overflow (``norm`` as in
+    fixed_point.scale_sos). Each section is direct form I: a single wide
+    accumulator, then one rounding shift and saturation back to the word.
+    Samples are Q(word_bits - 1) (full scale is +-1).
+    """
+    fmt = FORMATS[fmt_name]
+    sos = order_sections(np.atleast_2d(np.asarray(sos, dtype=float)), norm)
+    coefficients, shifts = fixed_point_sections(sos, fmt)
+    sections = len(sos)
+    upper = name.upper()
+    word, acc = f"int{fmt.word_bits}_t", f"int{fmt.accumulator_bits}_t"
+    word_max, word_min = f"INT{fmt.word_bits}_MAX", f"INT{fmt.word_bits}_MIN"
+    rows = ",\n".join(f"    {{{', '.join(str(int(c)) for c in row)}}}" for row in coefficients)
+    rounding = f"(({acc})1 << (shift - 1))" if fmt.rounding == "round" else "0"
+    gain = cascade_norms(sos, norm)[-1]
+    header = c_header(name, word, f"Cascade of second-order sections (direct form I, {fmt_name})",
+                      [f"Sections: {sections}", f"Accumulator: {acc}, {fmt.rounding} and saturate",
+                       f"Scaling: {norm} norm, overall {norm} gain {gain:.4g}"
+                       + (f" (inputs above {1 / gain:.3g} of full scale may saturate)" if gain > 1 else ""),
+                       *details],
+                      includes="\n#include <stdint.h>")
+    return header + f"""
+#define {upper}_SECTIONS {sections}
+
+/* One row per section: b0, b1, b2, a1, a2 as integers scaled by 2^{name}_shift[k] */
+static const {word} {name}_coeffs[{upper}_SECTIONS][5] = {{
+{rows}
+}};
+static const int {name}_shift[{upper}_SECTIONS] = {{{", ".join(map(str, shifts))}}};
+
+typedef struct {{
+    {word} s[{upper}_SECTIONS][4];  /* x[n-1], x[n-2], y[n-1], y[n-2] */
+}} {name}_state;
+
+void {name}_reset({name}_state *state) {{
+    memset(state, 0, sizeof(*state));
+}}
+
+size_t {name}_state_size(void) {{
+    return sizeof({name}_state);
+}}
+
+static {word} {name}_saturate({acc} value) {{
+    return value > {word_max} ? {word_max} : value < {word_min} ? {word_min} : ({word})value;
+}}
+
+/* Assumes >> of a negative value is an arithmetic shift, as on every common compiler */
+void {name}_process_block(const {word} *restrict in, {word} *restrict out, size_t n, {name}_state *state) {{
+    const {word} *src = in;
+    for (int k = 0; k < {upper}_SECTIONS; k++) {{
+        const {acc} b0 = {name}_coeffs[k][0], b1 = {name}_coeffs[k][1], b2 = {name}_coeffs[k][2];
+        const {acc} a1 = {name}_coeffs[k][3], a2 = {name}_coeffs[k][4];
+        const int shift = {name}_shift[k];
+        const {acc} rounding = {rounding};
+        {word} x1 = state->s[k][0], x2 = state->s[k][1], y1 = state->s[k][2], y2 = state->s[k][3];
+        for (size_t i = 0; i < n; i++) {{
+            const {word} x = src[i];
+            const {acc} sum = rounding + b0 * x + b1 * x1 + b2 * x2 - a1 * y1 - a2 * y2;
+            const {word} y = {name}_saturate(sum >> shift);
+            x2 = x1;
+            x1 = x;
+            y2 = y1;
+            y1 = y;
+            out[i] = y;
+        }}
+        state->s[k][0] = x1;
+        state->s[k][1] = x2;
+        state->s[k][2] = y1;
+        state->s[k][3] = y2;
+        src = out;
+    }}
+}}
+""" + c_test_main(name, word, impulse=f"{word_max} / 2", scale=f" / {2 ** (fmt.word_bits - 1)}.0")
+
+
+def generate_fixed_fir_c(taps, fmt_name="Q15", name="filter", details=()):
+    """
+    Integer-only C source of a direct form FIR from its taps, laid out as
+    generate_fir_c. All taps share one shift, so every output is a single wide
+    accumulator with one rounding shift and saturation back to the word;
+    there is no intermediate node to scale. Samples are Q(word_bits - 1).
+    """
+    fmt = FORMATS[fmt_name]
+    taps = np.atleast_1d(np.asarray(taps, dtype=float))
+    integers, shift = fixed_point_coefficients(taps, fmt)
+    count = len(taps)
+    upper = name.upper()
+    word, acc = f"int{fmt.word_bits}_t", f"int{fmt.accumulator_bits}_t"
+    word_max, word_min = f"INT{fmt.word_bits}_MAX", f"INT{fmt.word_bits}_MIN"
+    rounding = f"(({acc})1 << ({upper}_SHIFT - 1))" if fmt.rounding == "round" else "0"
+    gain = np.sum(np.abs(taps))
+    rows = ",\n    ".join(", ".join(str(int(c)) for c in integers[i:i + 8]) for i in range(0, count, 8))
+    header = c_header(name, word, f"Direct form FIR ({fmt_name})",
+                      [f"Taps: {count}", f"Accumulator: {acc}, {fmt.rounding} and saturate",
+                       f"Overall l1 gain {gain:.4g}"
+                       + (f" (inputs above {1 / gain:.3g} of full scale may saturate)" if gain > 1 else ""),
+                       *details],
+                      includes="\n#include <stdint.h>")
+    return header + f"""
+#define {upper}_TAPS {count}
+#define {upper}_SHIFT {shift}
+
+/* Taps as integers scaled by 2^{upper}_SHIFT */
+static const {word} {name}_taps[{upper}_TAPS] = {{
+    {rows}
+}};
+
+typedef struct {{
+    {word} x[{upper}_TAPS];  /* x[n-1], x[n-2], ... at the end of the last block (the last one unused) */
+}} {name}_state;
+
+void {name}_reset({name}_state *state) {{
+    memset(state, 0, sizeof(*state));
+}}
+
+size_t {name}_state_size(void) {{
+    return sizeof({name}_state);
+}}
+
+static {word} {name}_saturate({acc} value) {{
+    return value > {word_max} ? {word_max} : value < {word_min} ? {word_min} : ({word})value;
+}}
+
+/* Assumes >> of a negative value is an arithmetic shift, as on every common compiler */
+void {name}_process_block(const {word} *restrict in, {word} *restrict out, size_t n, {name}_state *state) {{
+    for (size_t i = 0; i < n; i++) {{
+        const size_t direct = i + 1 < {upper}_TAPS ? i + 1 : {upper}_TAPS;
+        {acc} sum = {rounding};
+        for (size_t j = 0; j < direct; j++) {{
+            sum += ({acc}){name}_taps[j] * in[i - j];
+        }}
+        for (size_t j = direct; j < {upper}_TAPS; j++) {{
+            sum += ({acc}){name}_taps[j] * state->x[j - i - 1];
+        }}
+        out[i] = {name}_saturate(sum >> {upper}_SHIFT);
+    }}
+    const size_t kept = n < {upper}_TAPS ? n : {upper}_TAPS;
+    memmove(state->x + kept, state->x, ({upper}_TAPS - kept) * sizeof(state->x[0]));
+    for (size_t j = 0; j < kept; j++) {{
+        state->x[j] = in[n - 1 - j];
+    }}
+}}
+""" + c_test_main(name, word, impulse=f"{word_max} / 2", scale=f" / {2 ** (fmt.word_bits - 1)}.0")
@@ -0,0 +1,345 @@
+import os
+import pickle
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+from scipy.signal import butter, cheby1, cheby2, ellip, bessel, firls, firwin, freqz, freqz_zpk, remez, zpk2sos
+
+from frequency_response import adaptive_frequency_grid
+from profiling import span
+
+# Default stopband attenuation (dB) used by the elliptic designs
+DEFAULT_ATTENUATION = 40
+
+# Normalized cutoff of the lowpass prototypes that the frequency transformations start from
+PROTOTYPE_CUTOFF = 0.5
+
+BAND_TYPES = OrderedDict([
+    ("LPF", "low"),
+    ("HPF", "high"),
+    ("BPF", "band"),
+])
+
+# family -> (design function, uses ripple, uses attenuation)
+# Note: Chebyshev II takes the ripple slider value as its stopband attenuation.
+FAMILIES = OrderedDict([
+    ("Butterworth", (lambda order, band, btype, ripple, attenuation:
+                     butter(order, band, btype=btype, output='zpk'), False, False)),
+    ("Chebyshev I", (lambda order, band, btype, ripple, attenuation:
+                     cheby1(order, ripple, band, btype=btype, output='zpk'), True, False)),
+    ("Chebyshev II", (lambda order, band, btype, ripple, attenuation:
+                      cheby2(order, ripple, band, btype=btype, output='zpk'), True, False)),
+    ("Bessel", (lambda order, band, btype, ripple, attenuation:
+                bessel(order, band, btype=btype, output='zpk'), False, False)),
+    ("Elliptic", (lambda order, band, btype, ripple, attenuation:
+                  ellip(order, ripple, attenuation, band, btype=btype, output='zpk'), True, True)),
+])
+
+# FIR families take the taps and the band edges/desired gains of their pass and stop bands
+# (see fir_bands); the library order maps to FIR_TAPS_PER_ORDER * order + 1 taps.
+FIR_FAMILIES = OrderedDict([
+    ("Windowed-Sinc FIR", lambda taps, edges, band_type, bands, desired:
+        firwin(taps, edges, pass_zero=(band_type == "LPF"), fs=2)),
+    ("Least-Squares FIR", lambda taps, edges, band_type, bands, desired:
+        firls(taps, bands, np.repeat(desired, 2), fs=2)),
+    ("Parks-McClellan FIR", lambda taps, edges, band_type, bands, desired:
+        remez(taps, bands, desired, fs=2)),
+])
+FIR_TAPS_PER_ORDER = 32
+
+# Width of the transition bands of the least-squares and Parks-McClellan designs (normalized)
+FIR_TRANSITION = 0.05
+
+# Combobox text -> (family, band type), so the UI never has to parse its own labels
+LIBRARY_ENTRIES = OrderedDict(
+    (f"{family} {band_type}", (family, band_type))
+    for family in list(FAMILIES) + list(FIR_FAMILIES) for band_type in BAND_TYPES
+)
+
+FilterDesign = namedtuple("FilterDesign", ["zeros", "poles", "gain", "sos", "w", "h", "taps"], defaults=(None,))
+FilterDesign.__doc__ = """
+A library design: zpk, second-order sections and the unit-gain response on its
+adaptive grid. FIR designs carry their ``taps``, have no SOS and leave
+``zeros`` as None until DesignCache.get_with_zeros finds them.
+"""
+
+
+def band_edges(band_type, cutoff):
+    """Return the normalized band edge(s) the library uses for a given cutoff."""
+    if band_type == "BPF":
+        return [cutoff * 0.8, cutoff * 1.2]
+    return cutoff
+
+
+def max_cutoff_percent(band_type):
+    """Largest cutoff slider value (percent of Nyquist) whose band edges are all below 1."""
+    return max(value for value in range(1, 100) if np.max(band_edges(band_type, value / 100.0)) < 1)
+
+
+def design_key(family, band_type, order, cutoff, ripple=None, attenuation=DEFAULT_ATTENUATION):
+    """Build the cache key, dropping parameters the family ignores so they don't split the cache."""
+    if family not in FAMILIES and family not in FIR_FAMILIES:
+        raise ValueError(f"Unknown filter family: {family}")
+    if band_type not in BAND_TYPES:
+        raise ValueError(f"Unknown band type: {band_type}")
+    _, uses_ripple, uses_attenuation = FAMILIES.get(family, (None, False, False))
+    return (
+        family,
+        band_type,
+        int(order),
+        round(float(cutoff), 12),
+        round(float(ripple), 12) if uses_ripple else None,
+        round(float(attenuation), 12) if uses_attenuation else None,
+    )
+
+
+@span()
+def design_filter(family, band_type, order, cutoff, ripple=None, attenuation=DEFAULT_ATTENUATION):
+    """Design a library filter from scratch (no caching)."""
+    if family in FIR_FAMILIES:
+        return make_fir_design(design_fir(family, band_type, order, cutoff))
+    design_function = FAMILIES[family][0]
+    z, p, k = design_function(int(order), band_edges(band_type, cutoff), BAND_TYPES[band_type],
+                              ripple, attenuation)
+    return make_design(z, p, k)
+
+
+def fir_bands(band_type, cutoff):
+    """
+    Band edges (pairs, normalized) and desired gain per band around the
+    library band edge(s). The transition bands are FIR_TRANSITION wide, or
+    narrower when the edges sit close to each other or to 0 and 1, so every
+    band keeps at least half of its nominal width.
+    """
+    edges = np.atleast_1d(np.asarray(band_edges(band_type, cutoff), dtype=float))
+    check_band_edges(edges)
+    width = min(FIR_TRANSITION, np.min(np.diff(np.concatenate([[0.0], edges, [1.0]]))) / 2)
+    inner = np.column_stack([edges - width / 2, edges + width / 2]).ravel()
+    bands = np.concatenate([[0.0], inner, [1.0]])
+    desired = {"LPF": [1, 0], "HPF": [0, 1], "BPF": [0, 1, 0]}[band_type]
+    return edges, bands, np.array(desired, dtype=float)
+
+
+@span()
+def design_fir(family, band_type, order, cutoff):
+    """Taps of a library FIR design (odd length, so every band type is a type I linear-phase filter)."""
+    edges, bands, desired = fir_bands(band_type, cutoff)
+    return FIR_FAMILIES[family](FIR_TAPS_PER_ORDER * int(order) + 1, edges if edges.size > 1 else edges[0],
+                                band_type, bands, desired)
+
+
+def prototype_key(family, order, ripple=None, attenuation=DEFAULT_ATTENUATION):
+    """Key of the lowpass prototype shared by every cutoff and band type of a design."""
+    family, _, order, _, ripple, attenuation = design_key(family, "LPF", order, PROTOTYPE_CUTOFF,
+                                                          ripple, attenuation)
+    return family, order, ripple, attenuation
+
+
+@span()
+def design_prototype(family, order, ripple=None, attenuation=DEFAULT_ATTENUATION):
+    """Design the digital lowpass prototype (cutoff PROTOTYPE_CUTOFF) of a family."""
+    design_function = FAMILIES[family][0]
+    return design_function(int(order), PROTOTYPE_CUTOFF, "low", ripple, attenuation)
+
+
+def check_band_edges(edges):
+    edges = np.asarray(edges, dtype=float)
+    if np.any(edges <= 0) or np.any(edges >= 1):
+        raise ValueError("Digital filter critical frequencies must be 0 < Wn < 1")
+
+
+def transform_roots(roots, band_type, cutoffs):
+    """
+    Map lowpass-prototype roots to the given band type and cutoff(s) with the
+    z-domain (Constantinides) frequency transformations.
+
+    ``cutoffs`` may be a scalar or an array; the result has one row per cutoff,
+    with the same number of roots (LPF/HPF) or twice as many (BPF).
+    """
+    roots = np.asarray(roots, dtype=complex)[np.newaxis, :]
+    cutoffs = np.atleast_1d(np.asarray(cutoffs, dtype=float))[:, np.newaxis]
+    theta_p = np.pi * PROTOTYPE_CUTOFF
+
+    if band_type == "LPF":
+        omega_c = np.pi * cutoffs
+        alpha = np.sin((theta_p - omega_c) / 2) / np.sin((theta_p + omega_c) / 2)
+        return (roots + alpha) / (1 + alpha * roots)
+
+    if band_type == "HPF":
+        omega_c = np.pi * cutoffs
+        alpha = -np.cos((theta_p + omega_c) / 2) / np.cos((theta_p - omega_c) / 2)
+        return -(roots + alpha) / (1 + alpha * roots)
+
+    if band_type == "BPF":
+        low, high = np.pi * cutoffs * 0.8, np.pi * cutoffs * 1.2
+        alpha = np.cos((high + low) / 2) / np.cos((high - low) / 2)
+        k = np.tan(theta_p / 2) / np.tan((high - low) / 2)
+        a1 = 2 * alpha * k / (k + 1)
+        a2 = (k - 1) / (k + 1)
+        # Each prototype root Z gives z^2 (1 + a2 Z) - a1 (1 + Z) z + (a2 + Z) = 0
+        quad_a = 1 + a2 * roots
+        quad_b = -a1 * (1 + roots)
+        quad_c = a2 + roots
+        sqrt_disc = np.sqrt(quad_b ** 2 - 4 * quad_a * quad_c)
+        return np.concatenate([(-quad_b + sqrt_disc) / (2 * quad_a),
+                               (-quad_b - sqrt_disc) / (2 * quad_a)], axis=1)
+
+    raise ValueError(f"Unknown band type: {band_type}")
+
+
+@span()
+def transform_prototype(prototype, band_type, cutoffs):
+    """
+    Apply the frequency transformation to a (z, p, k) lowpass prototype for one
+    or many cutoffs at once. Returns (zeros, poles, gains) with one row per cutoff.
+
+    The digital prototypes from scipy have as many zeros as poles, so no roots
+    at infinity need to be mapped.
+    """
+    z, p, k = prototype
+    cutoffs = np.atleast_1d(np.asarray(cutoffs, dtype=float))
+    check_band_edges([band_edges(band_type, cutoff) for cutoff in cutoffs])
+    if len(z) != len(p):
+        raise ValueError("Prototype must have as many zeros as poles")
+
+    zeros = transform_roots(z, band_type, cutoffs)
+    poles = transform_roots(p, band_type, cutoffs)
+
+    # Match the gain at DC of the prototype, which maps onto a point of the new passband
+    reference = transform_roots(np.array([1.0]), band_type, cutoffs)[:, :1]
+    proto_value = np.prod(1 - np.asarray(z)) / np.prod(1 - np.asarray(p))
+    new_value = np.prod(reference - zeros, axis=1) / np.prod(reference - poles, axis=1)
+    gains = np.real(k * proto_value / new_value)
+
+    # Conjugate pairs come out of the maps with tiny imaginary round-off on real roots
+    zeros = np.where(np.abs(zeros.imag) < 1e-12, zeros.real, zeros)
+    poles = np.where(np.abs(poles.imag) < 1e-12, poles.real, poles)
+    return zeros, poles, gains
+
+
+@span()
+def make_design(z, p, k):
+    """Bundle a zpk design with its SOS matrix and precomputed frequency response."""
+    sos = zpk2sos(z, p, k)
+    w, h = freqz_zpk(z, p, 1, worN=adaptive_frequency_grid(z, p))
+    return FilterDesign(np.asarray(z), np.asarray(p), k, sos, w, h)
+
+
+@span()
+def make_fir_design(taps):
+    """
+    Bundle FIR taps with their response. Finding the zeros (eigenvalues of the
+    companion matrix, O(N^3)) is left to fir_zeros, so long designs only pay
+    for it when they are actually put on the z-plane.
+    """
+    taps = np.trim_zeros(np.asarray(taps, dtype=float))
+    gain = taps[0]
+    w, h = freqz(taps / gain, worN=adaptive_frequency_grid([], []))
+    return FilterDesign(None, np.array([], dtype=complex), gain, None, w, h, taps)
+
+
+@span()
+def fir_zeros(taps):
+    """Zeros of the FIR taps (highest power of z first, as in zpk2tf with gain taps[0])."""
+    return np.roots(taps).astype(complex)
+
+
+class DesignCache:
+    """LRU cache of library designs, optionally persisted to a pickle file across sessions."""
+
+    def __init__(self, maxsize=256, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.designs = OrderedDict()
+        self.prototypes = OrderedDict()  # lowpass prototypes, shared by every cutoff
+        self.hits = 0
+        self.misses = 0
+        if path:
+            self.load()
+
+    def get(self, family, band_type, order, cutoff, ripple=None, attenuation=DEFAULT_ATTENUATION):
+        key = design_key(family, band_type, order, cutoff, ripple, attenuation)
+        design = self.designs.get(key)
+        if design is not None:
+            self.designs.move_to_end(key)
+            self.hits += 1
+            return design
+
+        self.misses += 1
+        if family in FIR_FAMILIES:
+            design = make_fir_design(design_fir(family, band_type, order, cutoff))
+            self.put(key, design)
+            return design
+        return self.get_many(family, band_type, order, [cutoff], ripple, attenuation)[0]
+
+    def get_with_zeros(self, family, band_type, order, cutoff, ripple=None, attenuation=DEFAULT_ATTENUATION):
+        """Like get, with the zeros of FIR designs found on first use and kept in the cache."""
+        design = self.get(family, band_type, order, cutoff, ripple, attenuation)
+        if design.zeros is None:
+            design = design._replace(zeros=fir_zeros(design.taps))
+            self.put(design_key(family, band_type, order, cutoff, ripple, attenuation), design)
+        return design
+
+    def get_prototype(self, family, order, ripple=None, attenuation=DEFAULT_ATTENUATION):
+        key = prototype_key(family, order, ripple, attenuation)
+        prototype = self.prototypes.get(key)
+        if prototype is None:
+            prototype = design_prototype(family, order, ripple, attenuation)
+            self.prototypes[key] = prototype
+            while len(self.prototypes) > self.maxsize:
+                self.prototypes.popitem(last=False)
+        self.prototypes.move_to_end(key)
+        return prototype
+
+    def get_many(self, family, band_type, order, cutoffs, ripple=None, attenuation=DEFAULT_ATTENUATION):
+        """
+        Return the designs for a batch of cutoffs. Only the family/order/ripple
+        prototype is designed; missing cutoffs are reached in one vectorized
+        frequency transformation of its roots.
+        """
+        keys = [design_key(family, band_type, order, cutoff, ripple, attenuation) for cutoff in cutoffs]
+        designs = [self.designs.get(key) for key in keys]
+        missing = [i for i, design in enumerate(designs) if design is None]
+        if missing:
+            prototype = self.get_prototype(family, order, ripple, attenuation)
+            zeros, poles, gains = transform_prototype(prototype, band_type,
+                                                      [cutoffs[i] for i in missing])
+            for row, i in enumerate(missing):
+                designs[i] = make_design(zeros[row], poles[row], gains[row])
+                self.put(keys[i], designs[i])
+        return designs
+
+    def put(self, key, design):
+        self.designs[key] = design
+        self.designs.move_to_end(key)
+        while len(self.designs) > self.maxsize:
+            self.designs.popitem(last=False)
+
+    def clear(self):
+        self.designs.clear()
+        self.prototypes.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self):
+        """Load previously saved designs; a missing or unreadable file just leaves the cache empty."""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "rb") as file:
+                designs = pickle.load(file)
+        except Exception as e:
+            print(f"Could not load design cache {self.path}: {e}")
+            return
+        for key, design in designs.items():
+            self.put(key, design)
+
+    def save(self):
+        """Save the designs; an unwritable file is reported and otherwise ignored, like in load."""
+        if not self.path:
+            return
+        try:
+            with open(self.path, "wb") as file:
+                pickle.dump(self.designs, file)
+        except OSError as e:
+            print(f"Could not save design cache {self.path}: {e}")
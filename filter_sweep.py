@@ -0,0 +1,167 @@
+"""
+Parameter sweeps over the predefined filter library.
+
+Every (family, band type, order, ripple) group is designed once as a lowpass
+prototype and frequency-transformed to all of its cutoffs in one batch; the
+responses and metrics of the whole batch are then computed with broadcasted
+NumPy operations. Groups are independent and can be spread over a process pool.
+"""
+import csv
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from filter_library import (
+    BAND_TYPES, DEFAULT_ATTENUATION, FAMILIES, band_edges, design_prototype, transform_prototype
+)
+from frequency_response import zpk_magnitude_db_and_group_delay
+
+SWEEP_FIELDS = [
+    "family", "band_type", "order", "cutoff", "ripple",
+    "passband_ripple_db", "stopband_attenuation_db", "transition_width",
+    "max_group_delay", "stability_margin",
+]
+
+
+def valid_cutoffs(band_type, cutoffs):
+    """Drop cutoffs whose band edges fall outside (0, 1)."""
+    edges = np.array([np.ravel(band_edges(band_type, cutoff)) for cutoff in cutoffs])
+    keep = np.all((edges > 0) & (edges < 1), axis=1)
+    return np.asarray(cutoffs, dtype=float)[keep]
+
+
+def transition_width(w, magnitude_db, stopband_level):
+    """
+    Width between the last -3 dB point and the point after which the response
+    stays below ``stopband_level``, walking away from the passband along ``w``
+    (one row per design). NaN where the level is never reached.
+    """
+    above_3db = magnitude_db >= -3
+    above_stop = magnitude_db >= stopband_level
+    count = w.size
+    last_3db = count - 1 - np.argmax(above_3db[:, ::-1], axis=1)
+    last_stop = count - 1 - np.argmax(above_stop[:, ::-1], axis=1)
+    width = np.abs(w[np.minimum(last_stop + 1, count - 1)] - w[last_3db]) / np.pi
+    return np.where(above_stop[:, -1], np.nan, width)
+
+
+def sweep_metrics(band_type, cutoffs, zeros, poles, gains, points=2048, stopband_level=-20,
+                  stopband_gap=0.1):
+    """
+    Metrics of a batch of designs of one band type (rows of zeros/poles/gains).
+
+    - passband_ripple_db: peak-to-peak dB over the nominal passband
+    - stopband_attenuation_db: attenuation of the highest stopband lobe relative
+      to the passband peak, the stopband starting ``stopband_gap`` (normalized)
+      beyond the passband edge(s)
+    - transition_width: normalized width between the -3 dB point and the point
+      where the response stays below ``stopband_level`` (worst side for BPF)
+    - max_group_delay: largest passband group delay in samples
+    - stability_margin: 1 - max pole radius (negative when unstable)
+    """
+    w = np.linspace(0, np.pi, points, endpoint=False)
+    f = w / np.pi
+    cutoffs = np.asarray(cutoffs, dtype=float)[:, np.newaxis]
+    magnitude_db, delay = zpk_magnitude_db_and_group_delay(zeros, poles, gains, w)
+
+    if band_type == "LPF":
+        passband = f <= cutoffs
+        stopband = f >= cutoffs + stopband_gap
+    elif band_type == "HPF":
+        passband = f >= cutoffs
+        stopband = f <= cutoffs - stopband_gap
+    else:
+        low, high = cutoffs * 0.8, cutoffs * 1.2
+        passband = (f >= low) & (f <= high)
+        stopband = (f <= low - stopband_gap) | (f >= high + stopband_gap)
+
+    # Measure everything relative to the passband peak
+    peak = np.max(np.where(passband, magnitude_db, -np.inf), axis=1, keepdims=True)
+    relative_db = magnitude_db - peak
+    passband_ripple = peak[:, 0] - np.min(np.where(passband, magnitude_db, np.inf), axis=1)
+    stopband_peak = np.max(np.where(stopband, relative_db, -np.inf), axis=1)
+    stopband_attenuation = np.where(stopband.any(axis=1), -stopband_peak, np.nan)
+
+    if band_type == "LPF":
+        transition = transition_width(w, relative_db, stopband_level)
+    elif band_type == "HPF":
+        transition = transition_width(w[::-1], relative_db[:, ::-1], stopband_level)
+    else:
+        # Walk outwards from the band center on each side and keep the wider transition
+        center = np.pi * cutoffs[:, 0]
+        upper = np.where(w >= center[:, np.newaxis], relative_db, 0)
+        lower = np.where(w <= center[:, np.newaxis], relative_db, 0)
+        transition = np.fmax(transition_width(w, upper, stopband_level),
+                             transition_width(w[::-1], lower[:, ::-1], stopband_level))
+
+    max_delay = np.max(np.where(passband, delay, -np.inf), axis=1)
+    stability_margin = 1 - np.max(np.abs(poles), axis=1)
+    return {
+        "passband_ripple_db": passband_ripple,
+        "stopband_attenuation_db": stopband_attenuation,
+        "transition_width": transition,
+        "max_group_delay": max_delay,
+        "stability_margin": stability_margin,
+    }
+
+
+def sweep_group(family, band_type, order, ripple, cutoffs, attenuation=DEFAULT_ATTENUATION,
+                points=2048, stopband_level=-20, stopband_gap=0.1, batch_size=64):
+    """Evaluate every cutoff of one (family, band type, order, ripple) group; returns metric rows."""
+    cutoffs = valid_cutoffs(band_type, cutoffs)
+    if cutoffs.size == 0:
+        return []
+    prototype = design_prototype(family, order, ripple, attenuation)
+    rows = []
+    for start in range(0, cutoffs.size, batch_size):
+        batch = cutoffs[start:start + batch_size]
+        zeros, poles, gains = transform_prototype(prototype, band_type, batch)
+        metrics = sweep_metrics(band_type, batch, zeros, poles, gains, points, stopband_level,
+                                stopband_gap)
+        for i, cutoff in enumerate(batch):
+            row = {"family": family, "band_type": band_type, "order": int(order),
+                   "cutoff": float(cutoff), "ripple": ripple}
+            row.update({name: float(values[i]) for name, values in metrics.items()})
+            rows.append(row)
+    return rows
+
+
+def _sweep_group_star(args):
+    return sweep_group(*args[0], **args[1])
+
+
+def sweep_designs(families=None, band_types=None, orders=(2, 4, 6, 8), cutoffs=None, ripples=(1,),
+                  attenuation=DEFAULT_ATTENUATION, processes=None, **options):
+    """
+    Evaluate the grid families x band types x orders x cutoffs x ripples.
+
+    Families that ignore the ripple are evaluated once per order. With
+    ``processes`` > 1 the (family, band type, order, ripple) groups are spread
+    over a process pool. ``options`` are passed to sweep_group (points,
+    stopband_level, stopband_gap, batch_size). Returns a list of dict rows with
+    the keys in SWEEP_FIELDS.
+    """
+    families = list(FAMILIES) if families is None else list(families)
+    band_types = list(BAND_TYPES) if band_types is None else list(band_types)
+    cutoffs = np.linspace(0.05, 0.8, 16) if cutoffs is None else np.asarray(cutoffs, dtype=float)
+
+    tasks = []
+    for family, band_type, order in itertools.product(families, band_types, orders):
+        uses_ripple = FAMILIES[family][1]
+        for ripple in (ripples if uses_ripple else [None]):
+            tasks.append(((family, band_type, order, ripple, cutoffs, attenuation), options))
+
+    if processes and processes > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(_sweep_group_star, tasks))
+    else:
+        results = [_sweep_group_star(task) for task in tasks]
+    return [row for rows in results for row in rows]
+
+
+def write_sweep_csv(rows, filename):
+    with open(filename, mode='w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=SWEEP_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
@@ -0,0 +1,253 @@
+"""
+Bit-accurate fixed-point simulation of the Direct Form II and SOS realizations.
+
+Signals are Q(word_bits - 1) integers. Every coefficient set (the feedforward
+and feedback coefficients of the filter or of each section) gets its own
+number of fractional bits, the most that still fits the word. Products are
+summed in an ``accumulator_bits`` accumulator and shifted back to the word
+with the chosen rounding; overflows either saturate or wrap and are counted.
+
+The recursive part of each section runs sample by sample (vectorized over
+channels); the feedforward part is an exact integer convolution over the
+whole signal at once.
+
+For fixed-point code, scale_sos folds overflow scaling into the section
+numerators and order_sections picks the section order with the least
+output roundoff noise.
+"""
+import itertools
+from collections import namedtuple
+
+import numpy as np
+from scipy import signal
+
+FixedPointFormat = namedtuple("FixedPointFormat", ["word_bits", "accumulator_bits", "rounding", "overflow"])
+FixedPointFormat.__doc__ = """Word/accumulator widths, rounding ("round" or "floor") and overflow ("saturate" or "wrap")."""
+
+FORMATS = {
+    "Q15": FixedPointFormat(16, 32, "round", "saturate"),
+    "Q31": FixedPointFormat(32, 64, "round", "saturate"),
+}
+
+FixedPointResult = namedtuple("FixedPointResult", [
+    "output", "reference", "snr_db", "overflows", "w", "h_ideal", "h_quantized",
+])
+FixedPointResult.__doc__ = """
+Simulated output and float64 reference (both in full-scale units), SNR of
+the output against the reference, overflow counts per stage ("input",
+"accumulator", "state", "output"), and the ideal and quantized-coefficient
+frequency responses.
+"""
+
+
+def limit(values, bits, overflow, approx=None):
+    """
+    Saturate or wrap integers to a signed ``bits``-bit range; returns (values, overflow count).
+    ``approx`` is a float estimate used to detect overflows the int64 values themselves wrapped.
+    """
+    high = (1 << (bits - 1)) - 1
+    low = -(1 << (bits - 1))
+    estimate = values if approx is None else approx
+    overflowed = (estimate > high) | (estimate < low)
+    if overflow == "saturate":
+        values = np.where(estimate > high, high, np.where(estimate < low, low, values))
+    elif bits < 64:
+        values = ((values - low) & ((1 << bits) - 1)) + low
+    return values.astype(np.int64), int(np.count_nonzero(overflowed))
+
+
+def shift_right(values, shift, rounding):
+    """Arithmetic right shift with rounding to nearest (ties up) or towards -inf."""
+    if shift <= 0:
+        return values << -shift
+    if rounding == "round":
+        values = values + (1 << (shift - 1))
+    return values >> shift
+
+
+def coefficient_bits(coefficients, word_bits):
+    """Fractional bits that fit the largest coefficient into a signed word."""
+    peak = np.max(np.abs(coefficients)) if np.size(coefficients) else 0.0
+    integer_bits = max(int(np.floor(np.log2(peak))) + 1, 0) if peak > 0 else 0
+    return word_bits - 1 - integer_bits
+
+
+def quantize(values, frac_bits, fmt):
+    """Float values to Q(frac_bits) integers in the word, with the format's rounding and overflow."""
+    scaled = np.asarray(values, dtype=float) * 2.0 ** frac_bits
+    scaled = np.floor(scaled + 0.5) if fmt.rounding == "round" else np.floor(scaled)
+    return limit(scaled.astype(np.int64), fmt.word_bits, fmt.overflow, approx=scaled)
+
+
+def quantize_section(b, a, fmt):
+    """(b_q, b_frac, a_q, a_frac) of one Direct Form II section (a[0] normalized to 1, dropped)."""
+    b = np.asarray(b, dtype=float) / a[0]
+    a = np.asarray(a, dtype=float)[1:] / a[0]
+    b_frac = coefficient_bits(b, fmt.word_bits)
+    a_frac = coefficient_bits(a, fmt.word_bits)
+    return quantize(b, b_frac, fmt)[0], b_frac, quantize(a, a_frac, fmt)[0], a_frac
+
+
+def simulate_section(x, section, fmt, counts):
+    """Run Q(word_bits - 1) integers ``x`` (channels, n) through one quantized DF-II section."""
+    b_q, b_frac, a_q, a_frac = section
+    channels, length = x.shape
+    order = len(a_q)
+    data_bits = fmt.word_bits
+
+    # w[n] = x[n] - sum a_k w[n-k], with x aligned to the feedback coefficients' scale
+    w = np.zeros((channels, length + order), dtype=np.int64)
+    a_reversed = a_q[::-1]
+    a_float = a_reversed.astype(float)
+    aligned = shift_right(x, -a_frac, "floor")
+    for n in range(length):
+        history = w[:, n:n + order]
+        acc = aligned[:, n] - history @ a_reversed
+        acc, overflowed = limit(acc, fmt.accumulator_bits, fmt.overflow,
+                                approx=aligned[:, n] - history.astype(float) @ a_float)
+        counts["accumulator"] += overflowed
+        value, overflowed = limit(shift_right(acc, a_frac, fmt.rounding), data_bits, fmt.overflow)
+        counts["state"] += overflowed
+        w[:, n + order] = value
+
+    # y[n] = sum b_k w[n-k] for the whole signal at once
+    w_float = w.astype(float)
+    acc = np.array([np.convolve(row, b_q)[order:order + length] for row in w])
+    approx = np.array([np.convolve(row, b_q.astype(float))[order:order + length] for row in w_float])
+    acc, overflowed = limit(acc, fmt.accumulator_bits, fmt.overflow, approx=approx)
+    counts["accumulator"] += overflowed
+    y, overflowed = limit(shift_right(acc, b_frac, fmt.rounding), data_bits, fmt.overflow)
+    counts["output"] += overflowed
+    return y
+
+
+def run_sections(sections, x, fmt):
+    x = np.atleast_2d(np.asarray(x, dtype=float))
+    frac = fmt.word_bits - 1
+    counts = {"input": 0, "accumulator": 0, "state": 0, "output": 0}
+    data, counts["input"] = quantize(x, frac, fmt)
+    quantized_input = data * 2.0 ** -frac
+    for section in sections:
+        data = simulate_section(data, section, fmt, counts)
+    return data * 2.0 ** -frac, quantized_input, counts
+
+
+def result(output, quantized_input, reference_filter, counts, w, h_ideal, h_quantized, shape):
+    reference = reference_filter(quantized_input)
+    noise = np.sum((output - reference) ** 2)
+    snr_db = 10 * np.log10(np.sum(reference ** 2) / noise) if noise > 0 else np.inf
+    return FixedPointResult(output.reshape(shape), reference.reshape(shape), float(snr_db), counts,
+                            w, h_ideal, h_quantized)
+
+
+def simulate_df2(b, a, x, fmt=FORMATS["Q15"], worN=1024):
+    """
+    Simulate the single high-order Direct Form II realization of b/a on ``x``
+    (full-scale units, [-1, 1); 1-D or one row per channel).
+    """
+    b, a = np.atleast_1d(np.asarray(b, dtype=float)), np.atleast_1d(np.asarray(a, dtype=float))
+    length = max(len(b), len(a))
+    b, a = np.pad(b, (0, length - len(b))), np.pad(a, (0, length - len(a)))
+    section = quantize_section(b, a, fmt)
+    output, quantized_input, counts = run_sections([section], x, fmt)
+
+    b_q, b_frac, a_q, a_frac = section
+    w, h_ideal = signal.freqz(b, a, worN=worN)
+    _, h_quantized = signal.freqz(b_q * 2.0 ** -b_frac, np.concatenate([[1.0], a_q * 2.0 ** -a_frac]), worN=w)
+    return result(output, quantized_input, lambda x: signal.lfilter(b, a, x, axis=-1), counts,
+                  w, h_ideal, h_quantized, np.shape(x))
+
+
+def simulate_sos(sos, x, fmt=FORMATS["Q15"], worN=1024):
+    """Simulate the cascade of second-order DF-II sections ``sos`` on ``x`` (see simulate_df2)."""
+    sos = np.atleast_2d(np.asarray(sos, dtype=float))
+    sections = [quantize_section(row[:3], row[3:], fmt) for row in sos]
+    output, quantized_input, counts = run_sections(sections, x, fmt)
+
+    quantized_sos = np.array([np.concatenate([b_q * 2.0 ** -b_frac, [1.0], a_q * 2.0 ** -a_frac])
+                              for b_q, b_frac, a_q, a_frac in sections])
+    w, h_ideal = signal.sosfreqz(sos, worN=worN)
+    _, h_quantized = signal.sosfreqz(quantized_sos, worN=w)
+    return result(output, quantized_input, lambda x: signal.sosfilt(sos, x, axis=-1), counts,
+                  w, h_ideal, h_quantized, np.shape(x))
+
+
+def impulse_length(sos, tol=1e-9, max_length=65536):
+    """Samples until the slowest pole of ``sos`` has decayed below ``tol``."""
+    radius = max(np.max(np.abs(np.roots(row[3:])), initial=0.0) for row in sos)
+    if radius <= 0:
+        return 3 * len(sos) + 1
+    if radius >= 1:
+        return max_length
+    return int(min(max_length, np.ceil(np.log(tol) / np.log(radius)) + 3 * len(sos) + 1))
+
+
+def cascade_norms(sos, norm="l1", worN=2048):
+    """
+    Norm of the cascade of the first k sections for every k: "l1" (sum of the
+    impulse response, no overflow for any input within full scale) or "inf"
+    (peak of the magnitude response, no overflow for full-scale sinusoids).
+    """
+    if norm == "l1":
+        impulse = np.zeros(impulse_length(sos))
+        impulse[0] = 1.0
+        norms = []
+        for row in sos:
+            impulse = signal.sosfilt(row[np.newaxis], impulse)
+            norms.append(np.sum(np.abs(impulse)))
+        return np.array(norms)
+    if norm == "inf":
+        _, h = signal.sosfreqz(sos[:1], worN=worN)
+        norms = [np.max(np.abs(h))]
+        for row in sos[1:]:
+            h = h * signal.sosfreqz(row[np.newaxis], worN=worN)[1]
+            norms.append(np.max(np.abs(h)))
+        return np.array(norms)
+    raise ValueError(f"Unknown scaling norm: {norm}")
+
+
+def scale_sos(sos, norm="l1"):
+    """
+    Fold scale factors into the numerators so the output of every section but
+    the last has ``norm`` 1 from the input; the last section restores the
+    overall gain, so the cascade still realizes the same transfer function.
+    """
+    sos = np.array(sos, dtype=float)
+    sos = sos / sos[:, 3:4]
+    norms = cascade_norms(sos, norm)
+    if np.any(norms[:-1] == 0):
+        return sos
+    cumulative = np.concatenate([[1.0], 1.0 / norms[:-1], [1.0]])
+    sos[:, :3] *= (cumulative[1:] / cumulative[:-1])[:, np.newaxis]
+    return sos
+
+
+def roundoff_noise_gain(sos, worN=2048):
+    """
+    Output noise power per unit rounding-noise power when every section
+    rounds once at its output (direct form I): the noise of section k goes
+    through its own feedback and all later sections.
+    """
+    gain = 0.0
+    after = np.ones(worN)
+    for row in sos[::-1]:
+        _, feedback = signal.freqz([1.0], row[3:], worN=worN)
+        gain += np.mean(np.abs(feedback * after) ** 2)
+        after = after * signal.sosfreqz(row[np.newaxis], worN=worN)[1]
+    return float(gain)
+
+
+def order_sections(sos, norm="l1", exhaustive=5):
+    """
+    Scaled section ordering with the least output roundoff noise. Up to
+    ``exhaustive`` sections every order is tried, otherwise the given order
+    (poles closest to the unit circle last, as zpk2sos returns them) and its
+    reverse.
+    """
+    sos = np.atleast_2d(np.asarray(sos, dtype=float))
+    if len(sos) <= exhaustive:
+        orders = itertools.permutations(range(len(sos)))
+    else:
+        orders = [range(len(sos)), range(len(sos) - 1, -1, -1)]
+    candidates = [scale_sos(sos[list(order)], norm) for order in orders]
+    return min(candidates, key=roundoff_noise_gain)
@@ -0,0 +1,187 @@
+import numpy as np
+from scipy.signal import ZoomFFT
+
+# Roots closer than this to the unit circle are treated as on it
+UNIT_CIRCLE_TOL = 1e-9
+
+
+def root_terms(roots, w):
+    """
+    Yield (Re(e^-jw (e^jw - root)), |e^jw - root|^2) for each root along the
+    last axis, broadcast against the frequency grid. The cos/sin of the grid are
+    computed once so the per-root work is plain real arithmetic.
+    """
+    roots = np.asarray(roots, dtype=complex)
+    cos_w, sin_w = np.cos(w), np.sin(w)
+    for i in range(roots.shape[-1]):
+        d_real = cos_w - roots.real[..., i, np.newaxis]
+        d_imag = sin_w - roots.imag[..., i, np.newaxis]
+        yield cos_w * d_real + sin_w * d_imag, d_real * d_real + d_imag * d_imag
+
+
+def root_delays(roots, w):
+    """
+    Yield Re(e^jw / (e^jw - root)), the group delay term of each root. A root on
+    the unit circle contributes 0.5 everywhere but at its own angle, where the
+    quotient is round-off over round-off, so it is taken as that constant.
+    """
+    roots = np.asarray(roots, dtype=complex)
+    on_circle = np.abs(np.abs(roots) - 1) < UNIT_CIRCLE_TOL
+    for i, (projection, distance) in enumerate(root_terms(roots, w)):
+        yield np.where(on_circle[..., i, np.newaxis], 0.5, projection / distance)
+
+
+def log_distance_sum(roots, w, chunk=16):
+    """Sum of log10 |e^jw - root|^2 over the roots; products of ``chunk`` roots share one log."""
+    total = 0
+    product = None
+    for i, (_, distance) in enumerate(root_terms(roots, w)):
+        product = distance if product is None else product * distance
+        if (i + 1) % chunk == 0:
+            total = total + np.log10(product)
+            product = None
+    if product is not None:
+        total = total + np.log10(product)
+    return total
+
+
+def zpk_magnitude_db(zeros, poles, gain, w):
+    """
+    Magnitude response in dB evaluated directly from the roots.
+
+    ``zeros``/``poles`` are (n,) for one design or (m, n) for a batch of m
+    designs, ``gain`` is a scalar or (m,). The result is (F,) or (m, F). The
+    response is accumulated as sums of per-root log distances, so high orders
+    neither overflow nor build (m, n, F) temporaries.
+    """
+    w = np.asarray(w, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_mag = 2 * np.log10(np.abs(np.asarray(gain, dtype=float)))[..., np.newaxis] + np.zeros(w.shape)
+        log_mag = log_mag + log_distance_sum(zeros, w) - log_distance_sum(poles, w)
+    return 10 * log_mag
+
+
+def zpk_frequency_response(zeros, poles, gain, w):
+    """
+    (w, h) from the roots, like freqz_zpk, but accumulated as a sum of per-root
+    complex logs so thousands of roots neither overflow nor underflow midway.
+    """
+    w = np.asarray(w, dtype=float)
+    unit = np.exp(1j * w)
+    log_h = np.zeros(w.shape, dtype=complex)
+    with np.errstate(divide='ignore'):
+        for root in np.ravel(zeros):
+            log_h += np.log(unit - root)
+        for root in np.ravel(poles):
+            log_h -= np.log(unit - root)
+    return w, gain * np.exp(log_h)
+
+
+def zpk_group_delay(zeros, poles, w):
+    """
+    Group delay in samples from the roots: every pole p contributes
+    Re(e^jw / (e^jw - p)) and every zero subtracts the same term.
+    Shapes follow zpk_magnitude_db.
+    """
+    w = np.asarray(w, dtype=float)
+    shape = np.broadcast_shapes(np.shape(zeros)[:-1], np.shape(poles)[:-1]) + w.shape
+    delay = np.zeros(shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for term in root_delays(poles, w):
+            delay = delay + term
+        for term in root_delays(zeros, w):
+            delay = delay - term
+    return delay
+
+
+def zpk_magnitude_db_and_group_delay(zeros, poles, gain, w):
+    """Magnitude (dB) and group delay of the roots in one pass over the per-root terms."""
+    w = np.asarray(w, dtype=float)
+    shape = np.broadcast_shapes(np.shape(zeros)[:-1], np.shape(poles)[:-1]) + w.shape
+    delay = np.zeros(shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_mag = 2 * np.log10(np.abs(np.asarray(gain, dtype=float)))[..., np.newaxis] + np.zeros(shape)
+        for roots, sign in ((poles, 1), (zeros, -1)):
+            product = np.ones(shape)
+            for i, ((_, distance), term) in enumerate(zip(root_terms(roots, w), root_delays(roots, w))):
+                delay += sign * term
+                product *= distance
+                if (i + 1) % 16 == 0:  # keep the running product in range for long root sets
+                    log_mag -= sign * np.log10(product)
+                    product = np.ones(shape)
+            log_mag -= sign * np.log10(product)
+    return 10 * log_mag, delay
+
+
+def adaptive_frequency_grid(zeros, poles, base_points=1024, points_per_root=48, log_spacing=False,
+                            min_frequency=1e-3):
+    """
+    Frequency grid on [0, pi) for plotting the response of the given roots.
+
+    A coarse base grid (uniform, or log-spaced down to ``min_frequency`` x pi
+    for a log axis) is refined around the angle of every root whose distance to
+    the unit circle is below a few base spacings. The refinement is spread
+    geometrically over +-16 times that distance (at least 1/16 of a base
+    spacing), so a root at radius 0.999 gets points within 1e-4 rad of its
+    notch/peak while flat regions stay coarse. Roots on the circle are not
+    sampled at their exact angle, where the response is zero or singular.
+    """
+    if log_spacing:
+        base = np.concatenate([[0.0], np.geomspace(min_frequency * np.pi, np.pi, base_points,
+                                                   endpoint=False)])
+    else:
+        base = np.linspace(0, np.pi, base_points, endpoint=False)
+
+    roots = np.concatenate([np.ravel(zeros), np.ravel(poles)]).astype(complex)
+    roots = roots[np.abs(roots) > 0]
+    width = np.abs(1 - np.abs(roots))
+    narrow = width < 8 * np.pi / base_points
+    if not np.any(narrow):
+        return base
+
+    angle = np.abs(np.angle(roots[narrow]))
+    on_circle = width[narrow] < UNIT_CIRCLE_TOL
+    # Roots on (or practically on) the circle still get a resolvable neighbourhood
+    width = np.maximum(width[narrow], np.pi / base_points / 16)[:, np.newaxis]
+    offsets = np.geomspace(1 / 16, 16, points_per_root // 2)
+    offsets = np.concatenate([offsets, -offsets])
+    refined = (angle[:, np.newaxis] + width * offsets).ravel()
+    # The exact angle of a root on the circle is a notch (or a singular pole), so it is only sampled off-circle
+    centers = angle[~on_circle]
+    refined = np.concatenate([refined, centers])
+    refined = refined[(refined >= 0) & (refined < np.pi)]
+    return np.unique(np.concatenate([base, refined]))
+
+
+def zoom_grid(w_low, w_high, points=2048, log_spacing=False):
+    """The ``points`` frequencies zoom_frequency_response evaluates on [w_low, w_high] (clipped to [0, pi])."""
+    w_low, w_high = max(float(w_low), 0.0), min(float(w_high), np.pi)
+    if log_spacing:
+        return np.geomspace(max(w_low, 1e-6), w_high, points)
+    return np.linspace(w_low, w_high, points)
+
+
+def zoom_frequency_response(zeros, poles, gain, w_low, w_high, points=2048, log_spacing=False,
+                            coefficients=None):
+    """
+    Response on ``points`` frequencies spanning only [w_low, w_high] rad/sample.
+
+    With the design's own (b, a) as ``coefficients`` (e.g. the taps of a long
+    FIR) it uses a chirp-z transform (ZoomFFT) of them, which costs
+    O((N + points) log) instead of O(N x points). Otherwise the response is
+    evaluated from the roots on the zoomed grid: polynomials rebuilt from many
+    roots are far too badly conditioned to transform. A log-spaced zoom always
+    uses the roots since the chirp-z contour is uniformly spaced.
+    """
+    w = zoom_grid(w_low, w_high, points, log_spacing)
+    w_low, w_high = w[0], w[-1]
+    if log_spacing or coefficients is None:
+        return zpk_frequency_response(zeros, poles, gain, w)
+
+    # Coefficients of z^-1, as used by lfilter/freqz
+    b, a = np.atleast_1d(coefficients[0]), np.atleast_1d(coefficients[1])
+    # ZoomFFT with fs=2 evaluates sum x[n] e^(-j pi f n) for f in [w_low, w_high] / pi
+    length = max(len(b), len(a))
+    transform = ZoomFFT(length, [w_low / np.pi, w_high / np.pi], m=points, fs=2, endpoint=True)
+    h = transform(np.pad(b, (0, length - len(b)))) / transform(np.pad(a, (0, length - len(a))))
+    return w, h
@@ -0,0 +1,99 @@
+"""
+Runtime statistics of the real-time filtering and the mouse path, for the
+status overlay. Ticks and mouse latencies are kept in short rolling windows,
+so recording costs a few deque appends.
+"""
+import time
+from collections import deque
+
+import numpy as np
+
+# Upper edges (ms) of the mouse latency histogram bins; the last bin is open-ended
+LATENCY_BINS_MS = (5, 10, 20, 50, 100, 200)
+HISTOGRAM_WIDTH = 20
+
+
+class RuntimeStats:
+    """
+    Rolling statistics of the timer-driven feed (ticks of ``samples``
+    processed, with their processing and draw times) and of the mouse path.
+
+    The feed is expected to deliver ``rate`` samples/s from ``start``; the lag
+    is how far the processed samples are behind that. A tick arriving more
+    than 1.5 periods after the previous one means the timer coalesced the
+    ticks in between, and those are counted as dropped.
+    """
+
+    def __init__(self, window=200):
+        self.ticks = deque(maxlen=window)  # (time, samples, processing s, draw s)
+        self.mouse_latencies = deque(maxlen=window)
+        self.rate = None
+        self.run_start = None
+        self.run_samples = 0
+        self.last_tick = None
+        self.dropped = 0
+
+    def start(self, rate, now=None):
+        """(Re)anchor the real-time clock, e.g. when the feed starts or its rate changes."""
+        self.rate = rate
+        self.run_start = time.perf_counter() if now is None else now
+        self.run_samples = 0
+        self.last_tick = None
+
+    def stop(self):
+        self.run_start = None
+        self.last_tick = None
+
+    def record_tick(self, samples, processing_time, draw_time, now=None):
+        now = time.perf_counter() if now is None else now
+        if self.last_tick is not None and self.rate:
+            periods = (now - self.last_tick) * self.rate
+            if periods > 1.5:
+                self.dropped += int(round(periods)) - 1
+        self.last_tick = now
+        self.run_samples += samples
+        self.ticks.append((now, samples, processing_time, draw_time))
+
+    def record_mouse(self, latency):
+        self.mouse_latencies.append(latency)
+
+    def samples_per_second(self):
+        if len(self.ticks) < 2:
+            return 0.0
+        span = self.ticks[-1][0] - self.ticks[0][0]
+        # The first tick's samples were processed before the window started
+        return sum(tick[1] for tick in list(self.ticks)[1:]) / span if span > 0 else 0.0
+
+    def lag(self, now=None):
+        """Seconds the processed samples are behind real time (0 when not running)."""
+        if self.run_start is None or not self.rate:
+            return 0.0
+        now = time.perf_counter() if now is None else now
+        return max(0.0, (now - self.run_start) - self.run_samples / self.rate)
+
+    def latency_histogram(self):
+        """Counts of the mouse latencies per LATENCY_BINS_MS bin (plus one open-ended bin)."""
+        edges = np.array(LATENCY_BINS_MS) / 1e3
+        return np.bincount(np.searchsorted(edges, list(self.mouse_latencies)), minlength=len(edges) + 1)
+
+    def summary(self):
+        """Overlay text."""
+        lines = [f"Feed: {self.samples_per_second():.1f} samples/s"
+                 + (f" (target {self.rate:g})" if self.run_start is not None else " (stopped)")
+                 + f", lag {self.lag():.2f} s"]
+        if self.ticks:
+            processing = np.array([tick[2] for tick in self.ticks]) * 1e3
+            draw = np.array([tick[3] for tick in self.ticks]) * 1e3
+            lines.append(f"Tick: process {processing.mean():.2f} ms (max {processing.max():.2f}), "
+                         f"draw {draw.mean():.1f} ms (max {draw.max():.1f})")
+        lines.append(f"Dropped/coalesced frames: {self.dropped}")
+        if self.mouse_latencies:
+            latencies = np.array(self.mouse_latencies) * 1e3
+            lines.append(f"Mouse latency (last {len(latencies)}): mean {latencies.mean():.1f} ms, "
+                         f"p90 {np.percentile(latencies, 90):.1f} ms")
+            counts = self.latency_histogram()
+            labels = [f"<{edge} ms" for edge in LATENCY_BINS_MS] + [f">={LATENCY_BINS_MS[-1]} ms"]
+            for label, count in zip(labels, counts):
+                bar = "#" * int(np.ceil(HISTOGRAM_WIDTH * count / counts.max())) if count else ""
+                lines.append(f"  {label:>9} {bar:<{HISTOGRAM_WIDTH}} {count}")
+        return "\n".join(lines)
@@ -0,0 +1,167 @@
+"""
+Interactive-latency benchmark on an offscreen Qt platform.
+
+Starts FilterDesignApp, replays synthetic mouse sequences as real Qt mouse
+events on the canvases (so they go through matplotlib's event handling to
+on_click/on_motion/on_release and on_mouse_motion), and measures the time
+from sending each event to the end of the last repaint it caused, after
+letting the event loop run idle draws and paints.
+
+    python latency_benchmark.py [results.json] [motion events]
+"""
+import os
+import sys
+import time
+
+# Must be set before Qt is imported
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import numpy as np
+from PyQt5.QtCore import QEvent, QObject, QPointF, Qt
+from PyQt5.QtGui import QMouseEvent
+from PyQt5.QtWidgets import QApplication
+
+from benchmarks import compare_runs, format_rows
+from c_benchmark import load_results, save_results
+
+RESULTS_FILE = "latency_results.json"
+PERCENTILES = (50, 90, 99)
+# Library design both sequences start from
+DESIGN = "Elliptic LPF"
+
+
+class PaintRecorder(QObject):
+    """Event filter that paints watched widgets itself, to time the end of every paint."""
+
+    def __init__(self, widgets):
+        super().__init__()
+        self.last_paint = None
+        self.paints = 0
+        for widget in widgets:
+            widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() != QEvent.Paint:
+            return False
+        # Calling event() directly does not pass through the filters again
+        obj.event(event)
+        self.last_paint = time.perf_counter()
+        self.paints += 1
+        return True
+
+
+def widget_position(canvas, ax, x, y):
+    """Widget coordinates of data point (x, y) of ``ax``, the inverse of matplotlib's Qt event mapping."""
+    display_x, display_y = ax.transData.transform((x, y))
+    ratio = canvas.device_pixel_ratio
+    return QPointF(display_x / ratio, (canvas.figure.bbox.height - display_y) / ratio)
+
+
+def settle(app, rounds=3):
+    """Run the event loop until the deferred draws and the paints they queue are done."""
+    for _ in range(rounds):
+        app.processEvents()
+
+
+def timed_event(app, recorder, widget, event_type, position, button, buttons):
+    """Latency (s) from sending one mouse event to the end of the last paint it caused (or to idle)."""
+    recorder.last_paint = None
+    event = QMouseEvent(event_type, position, button, buttons, Qt.NoModifier)
+    start = time.perf_counter()
+    QApplication.sendEvent(widget, event)
+    settle(app)
+    end = recorder.last_paint if recorder.last_paint is not None else time.perf_counter()
+    return end - start
+
+
+def show_tab_of(window, widget):
+    for index in range(window.tab_widget.count()):
+        if window.tab_widget.widget(index).isAncestorOf(widget):
+            window.tab_widget.setCurrentIndex(index)
+
+
+def load_design(window):
+    window.filter_library_combobox.setCurrentText(DESIGN)
+    window.load_predefined_filter()
+
+
+def drag_latencies(app, window, recorder, motions=100):
+    """Press on a pole of the library design, drag it around a small circle and release it."""
+    load_design(window)
+    show_tab_of(window, window.z_plane_canvas)
+    settle(app)
+    canvas, ax = window.z_plane_canvas, window.z_plane_ax
+    pole = max(window.poles, key=lambda p: p.imag)
+    path = pole + 0.1 * (np.exp(1j * np.linspace(0, 2 * np.pi, motions)) - 1)
+
+    press = timed_event(app, recorder, canvas, QEvent.MouseButtonPress,
+                        widget_position(canvas, ax, pole.real, pole.imag), Qt.LeftButton, Qt.LeftButton)
+    if window.selected_point is None:
+        raise RuntimeError("The synthetic press did not pick the pole")
+    moves = [timed_event(app, recorder, canvas, QEvent.MouseMove, widget_position(canvas, ax, z.real, z.imag),
+                         Qt.NoButton, Qt.LeftButton) for z in path]
+    release = timed_event(app, recorder, canvas, QEvent.MouseButtonRelease,
+                          widget_position(canvas, ax, path[-1].real, path[-1].imag), Qt.LeftButton, Qt.NoButton)
+    return {"z-plane press": [press], "z-plane drag motion": moves, "z-plane release": [release]}
+
+
+def mouse_pad_latencies(app, window, recorder, motions=100):
+    """Move over the mouse pad with mouse input enabled (filtering the generated signal point by point)."""
+    load_design(window)
+    window.checkbox.setChecked(True)
+    canvas, ax = window.mouse_input_canvas, window.mouse_input_ax
+    show_tab_of(window, canvas)
+    settle(app)
+    t = np.linspace(0, 1, motions)
+    positions = [widget_position(canvas, ax, 0.1 + 0.8 * value, 0.5 + 0.4 * np.sin(12 * np.pi * value))
+                 for value in t]
+    moves = [timed_event(app, recorder, canvas, QEvent.MouseMove, position, Qt.NoButton, Qt.NoButton)
+             for position in positions]
+    window.checkbox.setChecked(False)
+    return {"mouse pad motion": moves}
+
+
+def latency_rows(latencies):
+    rows = []
+    for name, values in latencies.items():
+        values = np.array(values) * 1e3
+        cases = {"mean": np.mean(values), **{f"p{q}": np.percentile(values, q) for q in PERCENTILES},
+                 "max": np.max(values)} if len(values) > 1 else {"latency": values[0]}
+        rows += [{"benchmark": name, "case": case, "value": float(value), "unit": "ms"}
+                 for case, value in cases.items()]
+    return rows
+
+
+def run_latency_benchmark(motions=100):
+    from main import FilterDesignApp
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = FilterDesignApp()
+    window.resize(1600, 1000)
+    window.show()
+    settle(app)
+    canvases = [window.z_plane_canvas, window.freq_response_canvas, window.phase_response_canvas,
+                window.group_delay_canvas, window.mouse_input_canvas, window.original_canvas, window.filtered_canvas]
+    recorder = PaintRecorder(canvases)
+    try:
+        latencies = drag_latencies(app, window, recorder, motions)
+        latencies.update(mouse_pad_latencies(app, window, recorder, motions))
+    finally:
+        window.close()
+        settle(app)
+    return latency_rows(latencies)
+
+
+def main(results_path=RESULTS_FILE, motions=100):
+    rows = run_latency_benchmark(int(motions))
+    print(format_rows(rows))
+    previous = load_results(results_path)
+    if previous:
+        regressions = compare_runs(previous[-1]["rows"], rows)
+        print("\n".join(["", "Regressions against the last run:"] + regressions) if regressions
+              else "\nNo regressions against the last run.")
+    save_results(rows, results_path)
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:3])
@@ -1,3 +1,4 @@
+import os
 import sys
 import numpy as np
 import matplotlib.pyplot as plt
@@ -5,21 +6,48 @@ import time
 import csv
 import scipy.signal as signal
 from scipy.signal import (
-    freqz, zpk2tf, butter, cheby1, cheby2, ellip, bessel, freqz_zpk,
+    zpk2tf, freqz_zpk,
     zpk2sos, tf2zpk, lfilter
 )
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QWidget, QPushButton,
-    QLabel, QSlider, QFileDialog, QCheckBox, QComboBox, QTableWidget, QMessageBox, QDialog, QTabWidget, QGraphicsView, QGraphicsScene
+    QLabel, QSlider, QFileDialog, QCheckBox, QComboBox, QTableWidget, QMessageBox, QDialog, QTabWidget, QGraphicsView, QGraphicsScene,
+    QInputDialog, QSpinBox
 )
 from PyQt5.QtCore import Qt, QTimer
-from PyQt5.QtGui import QCursor
+from PyQt5.QtGui import QCursor, QFont
 from matplotlib.backends.backend_qt5agg import (
     FigureCanvasQTAgg as FigureCanvas,
     NavigationToolbar2QT as NavigationToolbar
 )
 from matplotlib.patches import Circle
+from matplotlib.collections import LineCollection
 from scipy.signal import iirfilter
+from allpass import allpass_gain, allpass_roots, optimize_allpass, parametric_allpass_library
+from c_benchmark import (
+    RESULTS_FILE, benchmark_c_code, benchmark_signals, compare_results, format_rows, load_results, save_results
+)
+from c_codegen import (
+    C_TYPES, generate_fir_c, generate_fixed_fir_c, generate_fixed_sos_c, generate_parallel_c, generate_sos_c
+)
+from filter_library import DesignCache, LIBRARY_ENTRIES, max_cutoff_percent
+from fixed_point import FORMATS, FixedPointFormat, simulate_df2, simulate_sos
+from frequency_response import adaptive_frequency_grid, zoom_frequency_response, zoom_grid, zpk_group_delay
+from instrumentation import RuntimeStats
+from native_filter import NativeFilter
+from profiling import profiler, span
+from realizations import (
+    ENGINE_NAMES, FftFilter, make_engine, measure_fft_crossover, tf2lattice, tf2parallel, zpk2parallel,
+    zpk2statespace
+)
+from segmented_filter import segmented_lfilter
+from sensitivity import coefficient_sensitivity, format_sensitivity
+
+# Structures the C generator can emit, and their precisions (integer Q15/Q31 only for the cascade)
+C_STRUCTURES = ["Cascade (SOS)", "Parallel"]
+C_VARIANTS = [(structure, ctype) for structure in C_STRUCTURES for ctype in C_TYPES] + [
+    ("Cascade (SOS)", fmt_name) for fmt_name in FORMATS]
+
 
 class FilterDesignApp(QMainWindow):
     def __init__(self):
@@ -62,8 +90,13 @@ class FilterDesignApp(QMainWindow):
         self.prev_mouse_y = None
         self.filter_b, self.filter_a = [1.0, -0.5], [1.0, -0.5]  # Updated default filter coefficients
         self.filter_state = None
+        self.filter_engine = None  # streaming engine for non Direct Form II realizations
+        self.filter_engine_key = None
+        # FIR designs with at least this many taps run on the FFT engine (measured once per session)
+        self.fft_crossover = measure_fft_crossover()
 
         self.window_size = 100  # Number of points to display dynamically
+        self.runtime_stats = RuntimeStats()  # feed and mouse-path timings for the stats overlay
         self.enable_mouse=False
 
         self.selected_point = None
@@ -80,6 +113,10 @@ class FilterDesignApp(QMainWindow):
         
         self.active_all_pass_filters = [] # for storing active all pass filters 
 
+        # Library designs are cached; set FILTER_DESIGN_CACHE to a file path to keep them across sessions
+        self.design_cache = DesignCache(maxsize=256, path=os.environ.get("FILTER_DESIGN_CACHE"))
+        self.active_design = None  # library design currently shown, for its precomputed response
+
         self.initialize_ui()
 
     def create_plot_canvas(self):
@@ -109,15 +146,29 @@ class FilterDesignApp(QMainWindow):
         self.z_plane_canvas.figure.subplots_adjust(bottom=0.1,top=0.95,left=0.1,right=0.95)
         self.graph_layout.addWidget(self.z_plane_canvas)
 
-        # Frequency Response Plot
+        # Frequency Response Plot (with a toolbar for pan/zoom)
         self.freq_response_canvas, self.freq_response_ax = self.create_plot_canvas()
         self.freq_response_canvas.figure.subplots_adjust(bottom=0.1,top=0.95,left=0.1,right=0.95)
-        self.graph_layout.addWidget(self.freq_response_canvas)
+        freq_response_layout = QVBoxLayout()
+        freq_response_layout.addWidget(self.freq_response_canvas)
+        freq_response_layout.addWidget(NavigationToolbar(self.freq_response_canvas, self))
+        self.graph_layout.addLayout(freq_response_layout)
 
-        # Phase Response Plot
+        # Phase Response Plot (with a toolbar for pan/zoom)
         self.phase_response_canvas, self.phase_response_ax = self.create_plot_canvas()
         self.phase_response_canvas.figure.subplots_adjust(bottom=0.18,top=0.90,left=0.1,right=0.95)
-        self.graph_layout.addWidget(self.phase_response_canvas)
+        phase_response_layout = QVBoxLayout()
+        phase_response_layout.addWidget(self.phase_response_canvas)
+        phase_response_layout.addWidget(NavigationToolbar(self.phase_response_canvas, self))
+        self.graph_layout.addLayout(phase_response_layout)
+
+        # Group Delay Plot (with a toolbar for pan/zoom)
+        self.group_delay_canvas, self.group_delay_ax = self.create_plot_canvas()
+        self.group_delay_canvas.figure.subplots_adjust(bottom=0.18,top=0.90,left=0.12,right=0.95)
+        group_delay_layout = QVBoxLayout()
+        group_delay_layout.addWidget(self.group_delay_canvas)
+        group_delay_layout.addWidget(NavigationToolbar(self.group_delay_canvas, self))
+        self.graph_layout.addLayout(group_delay_layout)
 
 
 
@@ -183,12 +234,25 @@ class FilterDesignApp(QMainWindow):
         self.add_all_pass_button = QPushButton("Add All-Pass Filter")
         self.add_all_pass_button.clicked.connect(self.add_all_pass_filter)
         self.controls_layout.addWidget(self.add_all_pass_button)
+
+        # Automatic phase equalization with a cascade of second-order all-pass sections
+        self.equalizer_layout = QHBoxLayout()
+        self.equalizer_sections_combo = QComboBox()
+        self.equalizer_sections_combo.addItems(['1', '2', '3', '4', '5', '6'])
+        self.equalizer_sections_combo.setCurrentText('2')
+        self.optimize_all_pass_button = QPushButton("Optimize All-Pass Equalizer")
+        self.optimize_all_pass_button.clicked.connect(self.optimize_all_pass_equalizer)
+        self.equalizer_layout.addWidget(QLabel("Equalizer Sections:"))
+        self.equalizer_layout.addWidget(self.equalizer_sections_combo)
+        self.equalizer_layout.addWidget(self.optimize_all_pass_button)
+        self.controls_layout.addLayout(self.equalizer_layout)
         
         
 
         
 
         # self.add_editable_table()
+        self.init_design_plots()
         self.plot_z_plane()
         self.plot_frequency_response()
         self.plot_phase_response()
@@ -292,13 +356,19 @@ class FilterDesignApp(QMainWindow):
         self.load_filter_button = QPushButton("Load Filter")
         self.generate_c_code_button = QPushButton("Generate C Code")
         self.export_realization_button = QPushButton("Export Realization")
+        self.benchmark_c_code_button = QPushButton("Benchmark C Code")
+        self.fixed_point_button = QPushButton("Fixed-Point Simulation")
+        self.sensitivity_button = QPushButton("Coefficient Sensitivity")
+        self.profiling_button = QPushButton("Profiling")
 
         # Add buttons to layout
         buttons = [
             self.add_zero_button, self.add_pole_button, self.clear_zeros_button,
             self.clear_poles_button, self.clear_all_button, self.swap_zeros_poles_button,
             self.undo_button, self.redo_button, self.save_filter_button,
-            self.load_filter_button, self.generate_c_code_button, self.export_realization_button
+            self.load_filter_button, self.generate_c_code_button, self.export_realization_button,
+            self.benchmark_c_code_button, self.fixed_point_button, self.sensitivity_button,
+            self.profiling_button
         ]
         for button in buttons:
             self.buttons_layout.addWidget(button)
@@ -318,21 +388,35 @@ class FilterDesignApp(QMainWindow):
         self.load_filter_button.clicked.connect(self.load_filter)
         self.generate_c_code_button.clicked.connect(self.generate_c_code)
         self.export_realization_button.clicked.connect(self.export_realization)
+        self.benchmark_c_code_button.clicked.connect(self.benchmark_c_code)
+        self.fixed_point_button.clicked.connect(self.open_fixed_point_window)
+        self.sensitivity_button.clicked.connect(self.analyze_coefficient_sensitivity)
+        self.profiling_button.clicked.connect(self.profiling_menu)
 
          # Start/Stop Buttons
         self.load_signal_button = QPushButton("Load Signal")
         self.toggle_button = QPushButton("Start")
         self.restart_button = QPushButton("Reset")
+        self.filter_all_button = QPushButton("Filter Whole Signal")
         self.checkbox = QCheckBox("Enable Mouse Movement")
         self.checkbox.stateChanged.connect(self.checkbox_toggled)  # Connect checkbox signal
         self.control_layout = QHBoxLayout()
         self.load_signal_button.clicked.connect(self.load_signal)
         self.toggle_button.clicked.connect(self.toggle_filtering)
         self.restart_button.clicked.connect(self.restart_filtering)
+        self.filter_all_button.clicked.connect(self.filter_whole_signal)
         self.control_layout.addWidget(self.load_signal_button)
         self.control_layout.addWidget(self.toggle_button)
         self.control_layout.addWidget(self.restart_button)
+        self.control_layout.addWidget(self.filter_all_button)
         self.control_layout.addWidget(self.checkbox)
+
+        # Realization used by the real-time filtering
+        self.engine_combobox = QComboBox()
+        self.engine_combobox.addItems(ENGINE_NAMES)
+        self.engine_combobox.currentIndexChanged.connect(lambda: self.compute_filter_coefficients())
+        self.control_layout.addWidget(QLabel("Filter Engine:"))
+        self.control_layout.addWidget(self.engine_combobox)
         self.controls_layout.addLayout(self.control_layout)
 
 
@@ -353,6 +437,31 @@ class FilterDesignApp(QMainWindow):
         self.add_conjugates_checkbox.stateChanged.connect(self.ensure_conjugates)
         self.controls_layout.addWidget(self.add_conjugates_checkbox)
 
+        self.log_frequency_checkbox = QCheckBox("Log Frequency Axis (Hz)")
+        self.log_frequency_checkbox.stateChanged.connect(self.toggle_log_frequency)
+        self.controls_layout.addWidget(self.log_frequency_checkbox)
+
+        # Re-evaluate only the visible band at high resolution when the response views are zoomed
+        self.zoom_response_checkbox = QCheckBox("Zoomed Response (Chirp-Z)")
+        self.zoom_response_checkbox.stateChanged.connect(self.toggle_zoom_response)
+        self.controls_layout.addWidget(self.zoom_response_checkbox)
+
+        self.unwrap_phase_checkbox = QCheckBox("Unwrap Phase")
+        self.unwrap_phase_checkbox.stateChanged.connect(lambda: self.plot_phase_response())
+        self.controls_layout.addWidget(self.unwrap_phase_checkbox)
+
+        # Live throughput/latency overlay, refreshed only while it is shown
+        self.show_stats_checkbox = QCheckBox("Show Runtime Stats")
+        self.show_stats_checkbox.stateChanged.connect(self.toggle_stats_overlay)
+        self.controls_layout.addWidget(self.show_stats_checkbox)
+        self.stats_overlay = QLabel(self.main_widget)
+        self.stats_overlay.setFont(QFont("Monospace", 9))
+        self.stats_overlay.setStyleSheet("background-color: rgba(0, 0, 0, 170); color: white; padding: 6px;")
+        self.stats_overlay.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.stats_overlay.hide()
+        self.stats_timer = QTimer()
+        self.stats_timer.timeout.connect(self.update_stats_overlay)
+
         # Add filter parameters controls
         self.params_layout = QHBoxLayout()
 
@@ -365,7 +474,7 @@ class FilterDesignApp(QMainWindow):
         self.cutoff_label = QLabel("Cutoff Freq (Hz):")
         self.cutoff_slider = QSlider(Qt.Horizontal)
         self.cutoff_slider.setMinimum(1)
-        self.cutoff_slider.setMaximum(100)
+        self.cutoff_slider.setMaximum(99)
         self.cutoff_slider.setValue(20)
 
         # For Chebyshev filters
@@ -385,14 +494,15 @@ class FilterDesignApp(QMainWindow):
 
         # Expanded filter library
         self.filter_library_combobox = QComboBox()
-        self.filter_library_combobox.addItems([
-            "Butterworth LPF", "Butterworth HPF", "Butterworth BPF",
-            "Chebyshev I LPF", "Chebyshev I HPF", "Chebyshev I BPF",
-            "Chebyshev II LPF", "Chebyshev II HPF", "Chebyshev II BPF",
-            "Bessel LPF", "Bessel HPF", "Bessel BPF",
-            "Elliptic LPF", "Elliptic HPF", "Elliptic BPF"
-        ])
+        self.filter_library_combobox.addItems(LIBRARY_ENTRIES.keys())
+        self.filter_library_combobox.currentIndexChanged.connect(self.update_cutoff_range)
         self.filter_library_combobox.currentIndexChanged.connect(self.load_predefined_filter)
+        self.update_cutoff_range()
+
+        # Re-design the selected library filter while scrubbing its parameters
+        self.order_combo.currentIndexChanged.connect(self.load_predefined_filter)
+        self.cutoff_slider.valueChanged.connect(self.load_predefined_filter)
+        self.ripple_slider.valueChanged.connect(self.load_predefined_filter)
 
         self.controls_layout.addWidget(QLabel("Filter Library"))
         self.controls_layout.addWidget(self.filter_library_combobox)
@@ -478,7 +588,19 @@ class FilterDesignApp(QMainWindow):
             # Combine coefficients
             # coefficients = cascade_coefficients.copy()
             # coefficients.update(direct_form_coefficients)
-            coefficients = direct_form_coefficients
+            coefficients = direct_form_coefficients.copy()
+            try:
+                coefficients.update(self.lattice_realization())
+            except ValueError as e:
+                print(f"Lattice realization skipped: {e}")
+            try:
+                coefficients.update(self.parallel_realization())
+            except ValueError as e:
+                print(f"Parallel realization skipped: {e}")
+            try:
+                coefficients.update(self.state_space_realization())
+            except ValueError as e:
+                print(f"State-space realization skipped: {e}")
 
             # Export coefficients to a CSV file
             filename = "filter_coefficients.csv"
@@ -548,11 +670,13 @@ class FilterDesignApp(QMainWindow):
             if abs(z.real - event.xdata) < 0.05 and abs(z.imag - event.ydata) < 0.05:
                 self.selected_point = idx
                 self.selected_type = "zero"
+                self.start_drag_blit()
                 return
         for idx, p in enumerate(self.poles):
             if abs(p.real - event.xdata) < 0.05 and abs(p.imag - event.ydata) < 0.05:
                 self.selected_point = idx
                 self.selected_type = "pole"
+                self.start_drag_blit()
                 return
 
     def on_motion(self, event):
@@ -577,6 +701,8 @@ class FilterDesignApp(QMainWindow):
     
     def on_release(self, event):
         if self.selected_point is not None:
+            self.stop_drag_blit()
+            self.plot_phase_response()  # phase is not tracked while dragging
             self.ensure_conjugates()  # new added line
             self.save_to_history()
         self.selected_point = None
@@ -610,19 +736,25 @@ class FilterDesignApp(QMainWindow):
         self.plot_z_plane()
         self.plot_frequency_response()
 
-    def direct_form_ii_realization(self):
+    def realization_roots(self):
+        """Zeros and poles with the conjugates that are missing from the design added."""
         zeros_with_conjugates = []
         poles_with_conjugates = []
 
+        # Only add conjugates that are missing from the design itself
         for zero in self.zeros:
             zeros_with_conjugates.append(zero)
-            if not np.isreal(zero) and np.conj(zero) not in zeros_with_conjugates:
+            if not np.isreal(zero) and not any(abs(z - np.conj(zero)) < 1e-10 for z in self.zeros):
                 zeros_with_conjugates.append(np.conj(zero))
 
         for pole in self.poles:
             poles_with_conjugates.append(pole)
-            if not np.isreal(pole) and np.conj(pole) not in poles_with_conjugates:
+            if not np.isreal(pole) and not any(abs(p - np.conj(pole)) < 1e-10 for p in self.poles):
                 poles_with_conjugates.append(np.conj(pole))
+        return zeros_with_conjugates, poles_with_conjugates
+
+    def direct_form_ii_realization(self):
+        zeros_with_conjugates, poles_with_conjugates = self.realization_roots()
 
         # Get filter coefficients
         b, a = zpk2tf(zeros_with_conjugates, poles_with_conjugates, 1)
@@ -631,6 +763,24 @@ class FilterDesignApp(QMainWindow):
         coefficients = {"Numerator": b.tolist(), "Denominator": a.tolist()}
         return coefficients
 
+    def lattice_realization(self):
+        """Reflection (k) and ladder (v) coefficients of the lattice-ladder realization."""
+        direct_form = self.direct_form_ii_realization()
+        k, v = tf2lattice(direct_form["Numerator"], direct_form["Denominator"])
+        return {"Reflection": k.tolist(), "Ladder": v.tolist()}
+
+    def parallel_realization(self):
+        """Independent sections [b0, b1, a0, a1, a2] from the partial fractions, plus the direct FIR part."""
+        sections, fir = zpk2parallel(*self.realization_roots(), 1)
+        coefficients = {f"Parallel Section {i + 1}": section.tolist() for i, section in enumerate(sections)}
+        coefficients["Parallel FIR"] = fir.tolist()
+        return coefficients
+
+    def state_space_realization(self, form="balanced"):
+        """State-space matrices (row-major) in balanced form, or "modal"/"controllable"."""
+        matrices = zpk2statespace(*self.realization_roots(), 1, form)
+        return {f"State Space {name}": np.ravel(matrix).tolist() for name, matrix in zip("ABCD", matrices)}
+
     def cascade_realization(self):
         # Convert to second-order sections
         sos = zpk2sos(self.zeros,self. poles, 1)
@@ -641,20 +791,20 @@ class FilterDesignApp(QMainWindow):
 
     def undo(self):
         if self.history:
-            self.redo_stack.append((self.zeros.copy(), self.poles.copy()))
-            self.zeros, self.poles = self.history.pop()
+            self.redo_stack.append((self.zeros.copy(), self.poles.copy(), self.gain))
+            self.zeros, self.poles, self.gain = self.history.pop()
             self.plot_z_plane()
             self.plot_frequency_response()
 
     def redo(self):
         if self.redo_stack:
-            self.history.append((self.zeros.copy(), self.poles.copy()))
-            self.zeros, self.poles = self.redo_stack.pop()
+            self.history.append((self.zeros.copy(), self.poles.copy(), self.gain))
+            self.zeros, self.poles, self.gain = self.redo_stack.pop()
             self.plot_z_plane()
             self.plot_frequency_response()
 
     def save_to_history(self):
-        self.history.append((self.zeros.copy(), self.poles.copy()))
+        self.history.append((self.zeros.copy(), self.poles.copy(), self.gain))
         if len(self.history) > 50:  # Limit history size
             self.history.pop(0)
 
@@ -679,86 +829,14 @@ class FilterDesignApp(QMainWindow):
     def generate_c_code(self):
         file_name, _ = QFileDialog.getSaveFileName(self, "Generate C Code", "", "C Files (*.c)")
         if file_name:
+            choice, ok = QInputDialog.getItem(self, "Generate C Code", "Structure and precision:",
+                                              [f"{structure}, {ctype}" for structure, ctype in C_VARIANTS], 0, False)
+            if not ok:
+                return
             try:
-                # Get filter coefficients
-                b, a = zpk2tf(self.zeros, self.poles, 1)
-
-                # Generate C code
-                c_code = f"""
-    /**
-     * Auto-generated digital filter implementation
-     * Filter Type: Direct Form II
-     * Number of zeros: {len(self.zeros)}
-     * Number of poles: {len(self.poles)}
-     */
-
-    #include <stdio.h>
-    #include <string.h>
-
-    #define FILTER_ORDER {max(len(b) - 1, len(a) - 1)}
-    #define BUFFER_SIZE (FILTER_ORDER + 1)
-
-    // Filter coefficients
-    static const double b_coeffs[] = {{{', '.join(map(str, b))}}};
-    static const double a_coeffs[] = {{{', '.join(map(str, a))}}};
-
-    // State buffer for Direct Form II implementation
-    static double state[BUFFER_SIZE] = {{0.0}};
-    static int buffer_index = 0;
-
-    // Function to reset filter state
-    void reset_filter(void) {{
-        memset(state, 0, sizeof(state));
-        buffer_index = 0;
-    }}
-
-    // Process single sample through filter
-    double process_sample(double input) {{
-        double output = 0.0;
-        double new_state;
-
-        // Calculate new state
-        new_state = input;
-        for (int i = 1; i <= FILTER_ORDER; i++) {{
-            new_state -= a_coeffs[i] * state[(buffer_index - i + BUFFER_SIZE) % BUFFER_SIZE];
-        }}
-
-        // Update state buffer
-        state[buffer_index] = new_state;
-
-        // Calculate output
-        for (int i = 0; i <= FILTER_ORDER; i++) {{
-            output += b_coeffs[i] * state[(buffer_index - i + BUFFER_SIZE) % BUFFER_SIZE];
-        }}
-
-        // Update buffer index
-        buffer_index = (buffer_index + 1) % BUFFER_SIZE;
-
-        return output;
-    }}
-
-    // Example usage
-    #ifdef FILTER_TEST
-    int main() {{
-        // Test input samples
-        double test_samples[] = {{1.0, 0.0, 0.0, 0.0, 0.0}};
-        int num_samples = sizeof(test_samples) / sizeof(test_samples[0]);
-
-        printf("Testing filter implementation\\n");
-        printf("Input -> Output\\n");
-
-        for (int i = 0; i < num_samples; i++) {{
-            double output = process_sample(test_samples[i]);
-            printf("%f -> %f\\n", test_samples[i], output);
-        }}
-
-        return 0;
-    }}
-    #endif
-    """
-                # Write to file
+                structure, ctype = choice.rsplit(", ", 1)
                 with open(file_name, 'w') as f:
-                    f.write(c_code)
+                    f.write(self.c_code_source(structure, ctype))
 
                 # Show success message
                 QMessageBox.information(self, "Success", "C code generated successfully!")
@@ -766,6 +844,124 @@ class FilterDesignApp(QMainWindow):
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to generate C code: {str(e)}")
 
+    def c_code_source(self, structure="Cascade (SOS)", ctype="double"):
+        """
+        C source of the current design (with its gain) in the given structure
+        and precision. A library FIR exports its taps as a direct form FIR
+        instead of a cascade of its zeros.
+        """
+        zeros, poles = self.realization_roots()
+        details = [f"Number of zeros: {len(zeros)}", f"Number of poles: {len(poles)}"]
+        taps = self.fir_taps()
+        if structure == "Parallel":
+            sections, fir = tf2parallel(taps, [1.0]) if taps is not None else zpk2parallel(zeros, poles, self.gain)
+            return generate_parallel_c(sections, fir, ctype, details=details)
+        if taps is not None:
+            generate = generate_fixed_fir_c if ctype in FORMATS else generate_fir_c
+            return generate(taps, ctype, details=details)
+        if ctype in FORMATS:
+            return generate_fixed_sos_c(zpk2sos(zeros, poles, self.gain), ctype, details=details)
+        return generate_sos_c(zpk2sos(zeros, poles, self.gain), ctype, details=details)
+
+    def python_reference(self):
+        """SciPy (double precision) output function of the current design, for checking the generated C."""
+        taps = self.fir_taps()
+        if taps is not None:
+            return lambda x: np.convolve(x, taps)[:len(x)]
+        zeros, poles = self.realization_roots()
+        sos = zpk2sos(zeros, poles, self.gain)
+        return lambda x: signal.sosfilt(sos, x)
+
+    def benchmark_c_code(self):
+        """Compile the C code of the current design in every structure/precision, check and time it."""
+        try:
+            reference = self.python_reference()
+            signals = benchmark_signals()
+            if self.design_on_plane() is not None:
+                design = (f"{self.filter_library_combobox.currentText()} {self.order_combo.currentText()} "
+                          f"@{self.cutoff_slider.value() / 100.0:g}")
+            else:
+                design = f"Custom {len(self.zeros)}z/{len(self.poles)}p"
+            rows = []
+            for structure, ctype in C_VARIANTS:
+                rows += benchmark_c_code(self.c_code_source(structure, ctype), reference, ctype,
+                                         f"{design} {structure}", signals)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"C benchmark failed: {str(e)}")
+            return
+
+        previous = load_results()
+        regressions = compare_results(previous[-1]["rows"], rows) if previous else []
+        save_results(rows)
+        print(format_rows(rows))
+        message = QMessageBox(self)
+        message.setWindowTitle("C Benchmark")
+        message.setText("\n".join(["Regressions against the last run:"] + regressions) if regressions
+                        else f"Results saved to {RESULTS_FILE}.")
+        message.setDetailedText(format_rows(rows))
+        message.exec_()
+
+    def fixed_point_coefficients(self):
+        """(b, a, sos) of the current design with its gain, for the fixed-point simulation."""
+        taps = self.fir_taps()
+        if taps is not None:
+            return np.array(taps), np.array([1.0]), signal.tf2sos(taps, [1.0])
+        zeros, poles = self.realization_roots()
+        b, a = zpk2tf(zeros, poles, self.gain)
+        return np.real_if_close(b), np.real_if_close(a), zpk2sos(zeros, poles, self.gain)
+
+    def open_fixed_point_window(self):
+        self.fixed_point_window = FixedPointWindow(self)
+        self.fixed_point_window.show()
+
+    def analyze_coefficient_sensitivity(self):
+        """Monte-Carlo check of which realization keeps the design stable and in spec at a word length."""
+        word_bits, ok = QInputDialog.getInt(self, "Coefficient Sensitivity", "Coefficient word length (bits):",
+                                            16, 4, 32)
+        if not ok:
+            return
+        try:
+            b, a, sos = self.fixed_point_coefficients()
+            results = coefficient_sensitivity(b, a, sos, word_bits)
+        except ValueError as e:
+            QMessageBox.critical(self, "Error", f"Sensitivity analysis failed: {str(e)}")
+            return
+
+        print(format_sensitivity(results, word_bits))
+        stable = {name: result for name, result in results.items() if result.unstable_fraction == 0}
+        if stable:
+            best = min(stable, key=lambda name: stable[name].passband_deviation_db)
+            summary = (f"Stable in every trial: {', '.join(stable)}.\n"
+                       f"Smallest passband deviation: {best} ({stable[best].passband_deviation_db:.3g} dB).")
+        else:
+            summary = f"Every realization went unstable in some trials at {word_bits} bits."
+        message = QMessageBox(self)
+        message.setWindowTitle("Coefficient Sensitivity")
+        message.setText(summary)
+        message.setDetailedText(format_sensitivity(results, word_bits))
+        message.exec_()
+
+    def profiling_menu(self):
+        """Start/stop the cProfile and tracemalloc captures or dump the timing spans, without restarting."""
+        actions = {
+            ("Stop cProfile and save" if profiler.cprofile_active else "Start cProfile"): profiler.toggle_cprofile,
+            ("Stop tracemalloc and save" if profiler.tracemalloc_active else "Start tracemalloc"):
+                profiler.toggle_tracemalloc,
+            "Save timing spans": profiler.dump_spans,
+            "Reset timing spans": profiler.reset_spans,
+        }
+        action, ok = QInputDialog.getItem(self, "Profiling", "Action:", list(actions), 0, False)
+        if not ok:
+            return
+        try:
+            path = actions[action]()
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Could not write the profile: {str(e)}")
+            return
+        if path:
+            print(f"Profile written to {path}")
+            QMessageBox.information(self, "Profiling", f"Written to {path}")
+
     def add_all_pass_filter(self):
     # Ensure that the checkbox is checked before proceeding
         
@@ -791,113 +987,321 @@ class FilterDesignApp(QMainWindow):
         else:
             print("Enable the all-pass filter first.")
         
-    def plot_z_plane(self):
-        # Clear previous plot
-        self.z_plane_ax.clear()
+    def init_design_plots(self):
+        """Create the persistent artists of the z-plane, magnitude and phase views once."""
+        # Z-plane: unit circle, axes lines and one scatter per root type
         self.z_plane_ax.add_artist(Circle((0, 0), self.unit_circle_radius, color="black", fill=False))
-
-        # Plot main filter zeros/poles, including the all-pass filter
-        self.z_plane_ax.scatter([z.real for z in self.zeros], [z.imag for z in self.zeros], color="blue", label="Zeros")
-        self.z_plane_ax.scatter([p.real for p in self.poles], [p.imag for p in self.poles], color="red", label="Poles", marker='x')
-
+        self.zeros_scatter = self.z_plane_ax.scatter([], [], color="blue", label="Zeros")
+        self.poles_scatter = self.z_plane_ax.scatter([], [], color="red", label="Poles", marker='x')
         self.z_plane_ax.set_xlim([-3, 3])
         self.z_plane_ax.set_ylim([-1.5, 1.5])
         self.z_plane_ax.axhline(0, color='gray', linestyle='--', linewidth=0.5)
         self.z_plane_ax.axvline(0, color='gray', linestyle='--', linewidth=0.5)
         self.z_plane_ax.set_aspect('equal', adjustable='box')
         self.z_plane_ax.legend(loc='upper right')
-        self.z_plane_canvas.draw()
 
-    def plot_frequency_response(self):
-        self.freq_response_ax.clear()
+        # Magnitude response
+        self.freq_response_line, = self.freq_response_ax.plot([], [], color="blue", label="Magnitude Response")
+        self.freq_response_ax.set_title("Frequency Response")
+        self.freq_response_ax.set_xlabel("Normalized Frequency (xπ rad/sample)")
+        self.freq_response_ax.set_ylabel("Magnitude (dB)")
+        self.freq_response_ax.set_xlim(0, 1)
+        self.freq_response_ax.grid(True)
+        self.freq_response_canvas.figure.subplots_adjust(bottom=0.18,top=0.90,left=0.1,right=0.95)
+
+        # Phase response
+        self.phase_response_line, = self.phase_response_ax.plot([], [], label="Phase Response")
+        self.phase_response_ax.set_title("Phase Response")
+        self.phase_response_ax.set_xlabel("Normalized Frequency")
+        self.phase_response_ax.set_ylabel("Phase (radians)")
+        self.phase_response_ax.set_xlim(0, 1)
+        self.phase_response_ax.set_ylim(-np.pi - 0.2, np.pi + 0.2)
+
+        # Group delay
+        self.group_delay_line, = self.group_delay_ax.plot([], [], color="purple", label="Group Delay")
+        self.group_delay_ax.set_title("Group Delay")
+        self.group_delay_ax.set_xlabel("Normalized Frequency")
+        self.group_delay_ax.set_ylabel("Group Delay (samples)")
+        self.group_delay_ax.set_xlim(0, 1)
+        self.group_delay_ax.grid(True)
+
+        # Blitting state, filled in while a zero/pole is being dragged
+        self.drag_backgrounds = {}
+
+        # Recompute the zoomed band whenever the response views are panned/zoomed
+        self.freq_response_ax.callbacks.connect('xlim_changed', self.on_response_xlim_changed)
+        self.phase_response_ax.callbacks.connect('xlim_changed', self.on_response_xlim_changed)
+        self.group_delay_ax.callbacks.connect('xlim_changed', self.on_response_xlim_changed)
+
+    def root_offsets(self, roots):
+        """Return an (N, 2) array of (real, imag) scatter offsets for the given roots."""
+        roots = np.asarray(roots, dtype=complex)
+        return np.column_stack([roots.real, roots.imag]) if roots.size else np.empty((0, 2))
+
+    def drag_artists(self):
+        """
+        Canvas, axes and animated artists of each design view that is blitted
+        during drag. Phase and group delay are only refreshed on release.
+        """
+        return [
+            (self.z_plane_canvas, self.z_plane_ax, [self.zeros_scatter, self.poles_scatter]),
+            (self.freq_response_canvas, self.freq_response_ax, [self.freq_response_line]),
+        ]
+
+    def start_drag_blit(self):
+        """Render the static parts of the design views once and cache them for blitting."""
+        self.drag_backgrounds = {}
+        for canvas, ax, artists in self.drag_artists():
+            self.capture_background(canvas, ax, artists)
+
+    def capture_background(self, canvas, ax, artists):
+        for artist in artists:
+            artist.set_animated(True)
+        canvas.draw()
+        self.drag_backgrounds[canvas] = canvas.copy_from_bbox(ax.bbox)
+
+    def stop_drag_blit(self):
+        """Hand the animated artists back to the normal draw path and repaint."""
+        for canvas, ax, artists in self.drag_artists():
+            for artist in artists:
+                artist.set_animated(False)
+            canvas.draw_idle()
+        self.drag_backgrounds = {}
+
+    def refresh_canvas(self, canvas, ax, artists):
+        """Blit the artists over the cached background while dragging, otherwise schedule a redraw."""
+        background = self.drag_backgrounds.get(canvas)
+        if background is None:
+            canvas.draw_idle()
+            return
+        canvas.restore_region(background)
+        for artist in artists:
+            ax.draw_artist(artist)
+        canvas.blit(ax.bbox)
+
+    def detect_passband(self):
+        """Normalized (low, high) band where the response is within 3 dB of its peak."""
+        w, h = self.design_response()
+        with np.errstate(divide='ignore'):
+            magnitude = 20 * np.log10(abs(h))
+        above = np.flatnonzero(magnitude >= np.max(magnitude[np.isfinite(magnitude)]) - 3)
+        return w[above[0]] / np.pi, w[above[-1]] / np.pi
+
+    def optimize_all_pass_equalizer(self):
+        """Fit all-pass sections that flatten the group delay over the passband and add them."""
+        if not self.enable_all_pass_checkbox.isChecked():
+            print("Enable the all-pass filter first.")
+            return
+        if not self.poles:
+            QMessageBox.warning(self, "All-Pass Equalizer", "Design a filter with poles first.")
+            return
+
+        passband = self.detect_passband()
+        result = optimize_allpass(self.zeros, self.poles, passband,
+                                  second_order=int(self.equalizer_sections_combo.currentText()))
+
+        self.save_to_history()
+        self.zeros.extend(result.zeros)
+        self.poles.extend(result.poles)
+        # Each section scales the magnitude by 1/|p|; compensate so only the phase changes
+        compensation = allpass_gain(result.poles)
+        self.gain *= compensation
+        self.active_all_pass_filters.append({"zeros": list(result.zeros), "poles": list(result.poles),
+                                             "gain": compensation})
+        self.plot_z_plane()
+        self.plot_frequency_response()
+        self.plot_phase_response()
+        QMessageBox.information(
+            self, "All-Pass Equalizer",
+            f"Passband {passband[0]:.3f}-{passband[1]:.3f} (xπ rad/sample)\n"
+            f"Group delay variation: {result.variation_before:.2f} -> {result.variation_after:.2f} samples"
+        )
+
+    @span()
+    def plot_z_plane(self):
+        # Only the scatter offsets change, the unit circle/axes/legend are persistent
+        self.zeros_scatter.set_offsets(self.root_offsets(self.zeros))
+        self.poles_scatter.set_offsets(self.root_offsets(self.poles))
+        self.refresh_canvas(self.z_plane_canvas, self.z_plane_ax, [self.zeros_scatter, self.poles_scatter])
+
+    def toggle_log_frequency(self):
+        """Switch the magnitude/phase views between normalized frequency and a log axis in Hz."""
+        for ax in [self.freq_response_ax, self.phase_response_ax, self.group_delay_ax]:
+            if self.log_frequency_checkbox.isChecked():
+                ax.set_xscale('log')
+                ax.set_xlim(1e-3 * self.sample_rate / 2, self.sample_rate / 2)
+                ax.set_xlabel("Frequency (Hz)")
+            else:
+                ax.set_xscale('linear')
+                ax.set_xlim(0, 1)
+        if not self.log_frequency_checkbox.isChecked():
+            self.freq_response_ax.set_xlabel("Normalized Frequency (xπ rad/sample)")
+            self.phase_response_ax.set_xlabel("Normalized Frequency")
+            self.group_delay_ax.set_xlabel("Normalized Frequency")
+        self.plot_frequency_response()
+        self.plot_phase_response()
+
+    def toggle_zoom_response(self):
+        self.plot_frequency_response()
+        self.plot_phase_response()
+
+    def on_response_xlim_changed(self, ax):
+        if not self.zoom_response_checkbox.isChecked():
+            return
+        if ax is self.freq_response_ax:
+            self.plot_frequency_response()
+        elif ax is self.phase_response_ax:
+            self.plot_phase_response()
+        else:
+            self.plot_group_delay()
 
+    def visible_band(self, ax):
+        """Visible x range of a response view in rad/sample."""
+        low, high = sorted(ax.get_xlim())
+        if self.log_frequency_checkbox.isChecked():
+            return low / self.sample_rate * 2 * np.pi, high / self.sample_rate * 2 * np.pi
+        return low * np.pi, high * np.pi
+
+    def design_response(self, ax=None):
+        """
+        Response of the current zeros/poles/gain on an adaptive grid that is
+        dense only near roots close to the unit circle. The library design's
+        precomputed response is reused while it is still what is on the z-plane.
+        In zoom mode only the band visible in ``ax`` is evaluated.
+        """
+        log_axis = self.log_frequency_checkbox.isChecked()
+        band = self.zoomed_band(ax)
+        if band is not None:
+            taps = self.fir_taps()
+            coefficients = None if taps is None else (taps / taps[0], [1.0])
+            w, h = zoom_frequency_response(self.zeros, self.poles, 1, *band,
+                                           log_spacing=log_axis, coefficients=coefficients)
+        else:
+            response = None if log_axis else self.cached_response()
+            if response is None:
+                w = adaptive_frequency_grid(self.zeros, self.poles, log_spacing=log_axis)
+                response = freqz_zpk(self.zeros, self.poles, 1, worN=w)
+            w, h = response
+        # The precomputed and zoomed responses are for unit gain
+        return w, self.gain * h
+
+    def zoomed_band(self, ax):
+        """(w_low, w_high) to evaluate in zoom mode, or None for the full band."""
+        if ax is None or not self.zoom_response_checkbox.isChecked():
+            return None
+        w_low, w_high = self.visible_band(ax)
+        return (w_low, w_high) if w_low < min(w_high, np.pi) else None
+
+    def response_grid(self, ax=None):
+        """The frequencies design_response(ax) uses, without evaluating the response."""
+        log_axis = self.log_frequency_checkbox.isChecked()
+        band = self.zoomed_band(ax)
+        if band is not None:
+            return zoom_grid(*band, log_spacing=log_axis)
+        response = None if log_axis else self.cached_response()
+        if response is None:
+            return adaptive_frequency_grid(self.zeros, self.poles, log_spacing=log_axis)
+        return response[0]
+
+    def frequency_axis(self, w):
+        """Map rad/sample to the x units of the response views."""
+        if self.log_frequency_checkbox.isChecked():
+            return w / (2 * np.pi) * self.sample_rate
+        return w / np.pi
+
+    @span()
+    def plot_frequency_response(self):
         if self.zeros or self.poles:
             # Calculate frequency response based on updated zeros and poles
-            b, a = zpk2tf(self.zeros, self.poles, 1)
-            w, h = freqz(b, a, worN=8000)
-            self.freq_response_ax.plot(w / np.pi, 20 * np.log10(abs(h)), color="blue", label="Magnitude Response")
-            self.freq_response_ax.set_title("Frequency Response")
-            self.freq_response_ax.set_xlabel("Normalized Frequency (xπ rad/sample)")
-            self.freq_response_ax.set_ylabel("Magnitude (dB)")
-            self.freq_response_ax.grid(True)
-            self.freq_response_canvas.figure.subplots_adjust(bottom=0.18,top=0.90,left=0.1,right=0.95)
-        self.freq_response_canvas.draw()
+            w, h = self.design_response(self.freq_response_ax)
+            with np.errstate(divide='ignore'):
+                magnitude = 20 * np.log10(abs(h))
+            self.freq_response_line.set_data(self.frequency_axis(w), magnitude)
+            self.freq_response_line.set_visible(True)
+
+            self.fit_ylim(self.freq_response_canvas, self.freq_response_ax, self.freq_response_line, magnitude)
+        else:
+            self.freq_response_line.set_visible(False)
+        self.refresh_canvas(self.freq_response_canvas, self.freq_response_ax, [self.freq_response_line])
 
+    def fit_ylim(self, canvas, ax, line, values):
+        """Rescale the y axis only when the curve leaves (or is lost in) the current view."""
+        finite = values[np.isfinite(values)]
+        if not finite.size:
+            return
+        y_min, y_max = finite.min(), finite.max()
+        low, high = ax.get_ylim()
+        if y_min < low or y_max > high or (high - low) > 4 * (y_max - y_min + 1):
+            margin = 0.05 * (y_max - y_min) + 1
+            ax.set_ylim(y_min - margin, y_max + margin)
+            if canvas in self.drag_backgrounds:
+                # Ticks changed, so the cached background is stale
+                self.capture_background(canvas, ax, [line])
+
+    @span()
     def plot_phase_response(self):
         # Recalculate phase response based on updated zeros and poles
-        self.phase_response_ax.clear()
         if self.zeros or self.poles:
-            w, h = freqz_zpk(self.zeros, self.poles, 1)
-            self.phase_response_ax.clear()
-            self.phase_response_ax.plot(w / np.pi, np.angle(h), label="Phase Response")
-            self.phase_response_ax.set_title("Phase Response")
-            self.phase_response_ax.set_xlabel("Normalized Frequency")
-            self.phase_response_ax.set_ylabel("Phase (radians)")
-            self.phase_response_canvas.figure.subplots_adjust(bottom=0.18,top=0.90,left=0.1,right=0.95)
-        self.phase_response_canvas.draw()
+            w, h = self.design_response(self.phase_response_ax)
+            phase = np.angle(h)
+            if self.unwrap_phase_checkbox.isChecked():
+                phase = np.unwrap(phase)
+                self.fit_ylim(self.phase_response_canvas, self.phase_response_ax, self.phase_response_line, phase)
+            else:
+                self.phase_response_ax.set_ylim(-np.pi - 0.2, np.pi + 0.2)
+            self.phase_response_line.set_data(self.frequency_axis(w), phase)
+            self.phase_response_line.set_visible(True)
+        else:
+            self.phase_response_line.set_visible(False)
+        self.refresh_canvas(self.phase_response_canvas, self.phase_response_ax, [self.phase_response_line])
+
+        # Group delay is derived from the same design, so it follows the phase view
+        self.plot_group_delay()
+
+    @span()
+    def plot_group_delay(self):
+        """
+        Group delay summed analytically from per-root contributions on the same
+        grid as the other views, so there are no spikes from differentiating
+        the wrapped phase near roots (roots on the unit circle add their
+        constant 0.5 samples).
+        """
+        if self.zeros or self.poles:
+            w = self.response_grid(self.group_delay_ax)
+            delay = zpk_group_delay(self.zeros, self.poles, w)
+            self.group_delay_line.set_data(self.frequency_axis(w), delay)
+            self.group_delay_line.set_visible(True)
+            self.fit_ylim(self.group_delay_canvas, self.group_delay_ax, self.group_delay_line, delay)
+        else:
+            self.group_delay_line.set_visible(False)
+        self.refresh_canvas(self.group_delay_canvas, self.group_delay_ax, [self.group_delay_line])
+
+    def update_cutoff_range(self, index=None):
+        """Keep the cutoff slider where the selected band type has valid band edges (e.g. BPF's 1.2 x cutoff < 1)."""
+        _, band_type = LIBRARY_ENTRIES[self.filter_library_combobox.currentText()]
+        self.cutoff_slider.setMaximum(max_cutoff_percent(band_type))
 
-    def load_predefined_filter(self, index):
+    @span()
+    def load_predefined_filter(self, index=None):
         # Get parameters from UI
         order = int(self.order_combo.currentText())
         cutoff = self.cutoff_slider.value() / 100.0  # Normalize to [0,1]
         ripple = self.ripple_slider.value()
-
-        # For bandpass filters
-        if "BPF" in self.filter_library_combobox.currentText():
-            low_freq = cutoff * 0.8  # Lower cutoff
-            high_freq = cutoff * 1.2  # Upper cutoff
-            band = [low_freq, high_freq]
-        else:
-            band = cutoff
+        family, band_type = LIBRARY_ENTRIES[self.filter_library_combobox.currentText()]
+        # Scrubbing a parameter of the library design already on the plane only replaces that design;
+        # anything else (a hand-edited plane, another library entry) stays undoable
+        scrubbing = self.sender() in (self.order_combo, self.cutoff_slider, self.ripple_slider)
 
         try:
-            # Initialize filter based on selection
-            filter_type = self.filter_library_combobox.currentText()
-
-            if "Butterworth" in filter_type:
-                if "LPF" in filter_type:
-                    z, p, k = butter(order, band, btype='low', output='zpk')
-                elif "HPF" in filter_type:
-                    z, p, k = butter(order, band, btype='high', output='zpk')
-                else:  # BPF
-                    z, p, k = butter(order, band, btype='band', output='zpk')
-
-            elif "Chebyshev I" in filter_type:
-                if "LPF" in filter_type:
-                    z, p, k = cheby1(order, ripple, band, btype='low', output='zpk')
-                elif "HPF" in filter_type:
-                    z, p, k = cheby1(order, ripple, band, btype='high', output='zpk')
-                else:  # BPF
-                    z, p, k = cheby1(order, ripple, band, btype='band', output='zpk')
-
-            elif "Chebyshev II" in filter_type:
-                if "LPF" in filter_type:
-                    z, p, k = cheby2(order, ripple, band, btype='low', output='zpk')
-                elif "HPF" in filter_type:
-                    z, p, k = cheby2(order, ripple, band, btype='high', output='zpk')
-                else:  # BPF
-                    z, p, k = cheby2(order, ripple, band, btype='band', output='zpk')
-
-            elif "Bessel" in filter_type:
-                if "LPF" in filter_type:
-                    z, p, k = bessel(order, band, btype='low', output='zpk')
-                elif "HPF" in filter_type:
-                    z, p, k = bessel(order, band, btype='high', output='zpk')
-                else:  # BPF
-                    z, p, k = bessel(order, band, btype='band', output='zpk')
-
-            elif "Elliptic" in filter_type:
-                if "LPF" in filter_type:
-                    z, p, k = ellip(order, ripple, 40, band, btype='low', output='zpk')
-                elif "HPF" in filter_type:
-                    z, p, k = ellip(order, ripple, 40, band, btype='high', output='zpk')
-                else:  # BPF
-                    z, p, k = ellip(order, ripple, 40, band, btype='band', output='zpk')
+            design = self.design_cache.get_with_zeros(family, band_type, order, cutoff, ripple)
+            if not (scrubbing and self.design_on_plane() is not None):
+                self.save_to_history()
 
             # Update filter
-            self.zeros = list(z)
-            self.poles = list(p)
-            self.gain = k
+            self.zeros = list(design.zeros)
+            self.poles = list(design.poles)
+            self.gain = design.gain
+            self.active_design = design
 
             # Update plots
             self.plot_z_plane()
@@ -905,12 +1309,68 @@ class FilterDesignApp(QMainWindow):
             self.plot_phase_response()
 
         except Exception as e:
-            QMessageBox.warning(self, "Filter Design Error", f"Error creating filter: {str(e)}")
+            if scrubbing:
+                # No modal dialog per slider step
+                print(f"Error creating filter: {str(e)}")
+            else:
+                QMessageBox.warning(self, "Filter Design Error", f"Error creating filter: {str(e)}")
+
+    def design_on_plane(self):
+        """The active library design, if it is still what is on the z-plane."""
+        design = self.active_design
+        if design is None:
+            return None
+        if len(design.zeros) != len(self.zeros) or len(design.poles) != len(self.poles):
+            return None
+        if not (np.array_equal(design.zeros, self.zeros) and np.array_equal(design.poles, self.poles)):
+            return None
+        return design
+
+    def cached_response(self):
+        """Return the precomputed (w, h) of the library design if it is still what is on the z-plane."""
+        design = self.design_on_plane()
+        return None if design is None else (design.w, design.h)
+
+    def fir_taps(self):
+        """
+        Taps of the library FIR on the z-plane, if any. Rebuilding a long FIR
+        from its zeros (zpk2tf) is badly conditioned, so the design's own taps
+        are used until the zeros are edited.
+        """
+        design = self.design_on_plane()
+        return None if design is None else design.taps
+
+    def toggle_stats_overlay(self, state):
+        if state == 2:  # Checked
+            self.update_stats_overlay()
+            self.stats_overlay.show()
+            self.stats_overlay.raise_()
+            self.stats_timer.start(250)
+        else:
+            self.stats_timer.stop()
+            self.stats_overlay.hide()
+
+    def update_stats_overlay(self):
+        text = self.runtime_stats.summary()
+        spans = profiler.summary()
+        if spans:
+            text += f"\nSlowest spans (total):\n{spans}"
+        self.stats_overlay.setText(text)
+        self.stats_overlay.adjustSize()
+        # Top-right corner of the main widget
+        self.stats_overlay.move(self.main_widget.width() - self.stats_overlay.width() - 10, 10)
+
+    def closeEvent(self, event):
+        self.design_cache.save()
+        if isinstance(self.filter_engine, NativeFilter):
+            self.filter_engine.close()
+        super().closeEvent(event)
 
     def update_speed(self, value):
         self.speed = value
         if self.timer.isActive():
             self.timer.setInterval(1000 // self.speed)
+            self.runtime_stats.start(self.speed)
 
     def checkbox_toggled(self, state):
         if state == 2:  # Checked
@@ -924,9 +1384,11 @@ class FilterDesignApp(QMainWindow):
         if self.signal.size > 0 and self.x_values.size > 0:
             self.compute_filter_coefficients()
             self.timer.start(1000 // self.speed)
+            self.runtime_stats.start(self.speed)
 
     def stop_filtering(self):
         self.timer.stop()
+        self.runtime_stats.stop()
 
     def toggle_filtering(self):
         """Toggle the filtering process between start and stop."""
@@ -943,10 +1405,32 @@ class FilterDesignApp(QMainWindow):
         self.stop_filtering()
         self.index = 0
         self.filtered_signal.fill(0)  # Clear filtered signal
+        self.reset_filter_state()
         self.update_plots()  # Reset the plots
         self.toggle_button.setText("Start")
         self.filtering_active = False
 
+    def filter_whole_signal(self):
+        """Filter the whole loaded signal offline, split over all cores, and show the result."""
+        if self.filtering_active:
+            self.toggle_filtering()
+        self.compute_filter_coefficients()
+        if isinstance(self.filter_engine, FftFilter):
+            # Long FIRs: one FFT pass from the same steady state as lfilter_zi
+            self.filter_engine.reset(self.signal[0])
+            self.filtered_signal = self.filter_engine.process(self.signal)
+        else:
+            zi = signal.lfilter_zi(self.filter_b, self.filter_a) * self.signal[0]
+            try:
+                self.filtered_signal, _ = segmented_lfilter(self.filter_b, self.filter_a, self.signal, zi=zi)
+            except ValueError as e:
+                # Complex coefficients (a missing conjugate): one lfilter pass, kept real like the real-time path
+                print(f"Segmented filtering unavailable, using lfilter: {e}")
+                filtered, _ = signal.lfilter(self.filter_b, self.filter_a, self.signal, zi=zi)
+                self.filtered_signal = np.real(filtered)
+        self.index = len(self.signal)
+        self.update_plots()
+
     def load_signal(self):
         options = QFileDialog.Options()
         file_path, _ = QFileDialog.getOpenFileName(self, "Load Signal File", "", "CSV Files (*.csv);;All Files (*)", options=options)
@@ -957,33 +1441,88 @@ class FilterDesignApp(QMainWindow):
                 self.signal = data[:, 1]
                 self.filtered_signal = np.zeros_like(self.signal)
                 self.index = 0
+                self.reset_filter_state()
         # self.compute_filter_coefficients()
 
+    def reset_filter_state(self):
+        """Start every realization over from the steady state of the first sample, as lfilter_zi does."""
+        initial = self.signal[0] if len(self.signal) else 0.0
+        self.filter_state = signal.lfilter_zi(self.filter_b, self.filter_a) * initial
+        if self.filter_engine is not None:
+            self.filter_engine.reset(initial)
+
+    @span()
     def compute_filter_coefficients(self):
         """Compute filter coefficients based on zeros, poles, and gain."""
-        if self.zeros or self.poles:
+        taps = self.fir_taps()
+        if taps is not None:
+            self.filter_b, self.filter_a = np.array(taps), np.array([1.0])
+        elif self.zeros or self.poles:
             self.filter_b, self.filter_a = signal.zpk2tf(self.zeros, self.poles, self.gain)
             self.filter_b = np.real_if_close(self.filter_b)
             self.filter_a = np.real_if_close(self.filter_a)
         else:
             self.filter_b, self.filter_a = [1.0, -0.5], [1.0, -0.5]
         self.filter_state = signal.lfilter_zi(self.filter_b, self.filter_a) * self.signal[0]
+        self.update_filter_engine()
         print(f"Filter coefficients (b): {self.filter_b}")
         print(f"Filter coefficients (a): {self.filter_a}")
 
 
+    def update_filter_engine(self):
+        """
+        (Re)build the streaming engine of the selected realization. It is only
+        rebuilt when the design or the selection changed, so its state survives
+        the frequent coefficient refreshes of the mouse path.
+        """
+        engine_name = self.engine_combobox.currentText()
+        key = (engine_name, tuple(np.ravel(self.filter_b)), tuple(np.ravel(self.filter_a)))
+        if key == self.filter_engine_key:
+            return
+        self.filter_engine_key = key
+        if isinstance(self.filter_engine, NativeFilter):
+            self.filter_engine.close()
+        self.filter_engine = None
+        try:
+            # Native engines are compiled from exactly the source that "Generate C Code" exports
+            zpk = ((self.zeros, self.poles, self.gain) if self.zeros or self.poles
+                   else signal.tf2zpk(self.filter_b, self.filter_a))
+            self.filter_engine = make_engine(engine_name, self.filter_b, self.filter_a, zpk, self.fft_crossover,
+                                             lambda structure: NativeFilter(self.c_code_source(structure, "double")))
+            if isinstance(self.filter_engine, FftFilter):
+                print(f"FIR with {len(self.filter_b)} taps, using the FFT overlap-save engine")
+            if self.filter_engine is not None:
+                # Same opening transient as the Direct Form II path
+                self.filter_engine.reset(self.signal[0] if len(self.signal) else 0.0)
+        except (ValueError, RuntimeError) as e:
+            if isinstance(self.filter_engine, NativeFilter):
+                self.filter_engine.close()
+            self.filter_engine = None
+            print(f"{engine_name} engine unavailable, using Direct Form II: {e}")
+
+    @span()
     def process_next_point(self):
         """Process the next signal point and apply the filter."""
         if self.index < len(self.signal):
+            start = time.perf_counter()
             point = self.signal[self.index]
-            filtered_point, self.filter_state = signal.lfilter(
-                self.filter_b, self.filter_a, [point], zi=self.filter_state
-            )
+            if isinstance(self.filter_engine, NativeFilter) and self.filtered_signal.dtype == self.filter_engine.dtype:
+                # Read from and write into the signal buffers directly
+                filtered_point = self.filter_engine.process(self.signal[self.index:self.index + 1],
+                                                            out=self.filtered_signal[self.index:self.index + 1])
+            elif self.filter_engine is not None:
+                filtered_point = self.filter_engine.process([point])
+            else:
+                filtered_point, self.filter_state = signal.lfilter(
+                    self.filter_b, self.filter_a, [point], zi=self.filter_state
+                )
             self.filtered_signal[self.index] = filtered_point[0]
             self.index += 1
+            processed = time.perf_counter()
             self.update_plots()
+            self.runtime_stats.record_tick(1, processed - start, time.perf_counter() - processed)
         else:
-            self.timer.stop()
+            self.stop_filtering()
 
     def apply_filter(self, point):
         if not hasattr(self, 'filter_state'):
@@ -1017,6 +1556,7 @@ class FilterDesignApp(QMainWindow):
     #         self.original_canvas.draw()
     #         self.filtered_canvas.draw()
 
+    @span()
     def update_plots(self):
         """Update the original and filtered signal plots dynamically."""
         if self.index > 0:
@@ -1053,8 +1593,10 @@ class FilterDesignApp(QMainWindow):
 
 
 
+    @span()
     def on_mouse_motion(self, event):
         """Capture mouse motion to generate a real-time signal."""
+        start = time.perf_counter()
         self.compute_filter_coefficients()
         if self.enable_mouse:
             if event.inaxes != self.mouse_input_ax:
@@ -1074,11 +1616,14 @@ class FilterDesignApp(QMainWindow):
                 else:
                     self.filtered_mouse_signal.append(delta_y)  # Fallback in case of invalid filter
                 self.update_mouse_plot()
+                self.runtime_stats.record_mouse(time.perf_counter() - start)
             self.prev_mouse_y = event.ydata
 
     def apply_filter2(self, point):
         """Apply filter on a single point in real-time."""
 
+        if self.filter_engine is not None:
+            return self.filter_engine.process([point])[0]
         if self.filter_state is None and len(self.filter_a) > 1:
             self.filter_state = signal.lfilter_zi(self.filter_b, self.filter_a) * point
         if self.filter_state is not None:
@@ -1086,6 +1631,7 @@ class FilterDesignApp(QMainWindow):
             return filtered_point[0]
         return point  # Return original point if filtering is not possible
 
+    @span()
     def update_mouse_plot(self):
         """Update the mouse input signal plot dynamically."""
         self.original_ax.clear()
@@ -1110,7 +1656,7 @@ class PreviewWindow(QDialog):
         super().__init__()
         self.main_window = main_window  # Store the reference to the main window
         self.setWindowTitle("Preview Window")   
-        self.setGeometry(150, 150, 800, 600)
+        self.setGeometry(150, 150, 1000, 900)
 
         # Layout for the new window
         layout = QVBoxLayout()
@@ -1143,12 +1689,124 @@ class PreviewWindow(QDialog):
         add_button.clicked.connect(self.add_to_main)  # Close the window when clicked
         layout.addWidget(add_button)
 
+        # Parametric all-pass library: every candidate is evaluated in one batch and drawn
+        # as a single line collection / heatmap, so browsing only moves the highlight
+        self.library = parametric_allpass_library()
+        library_layout = QHBoxLayout()
+
+        self.overlay_fig, self.overlay_ax = plt.subplots()
+        self.overlay_canvas = FigureCanvas(self.overlay_fig)
+        library_layout.addWidget(self.overlay_canvas)
+
+        self.heatmap_fig, self.heatmap_ax = plt.subplots()
+        self.heatmap_canvas = FigureCanvas(self.heatmap_fig)
+        self.heatmap_canvas.mpl_connect('button_press_event', self.on_heatmap_click)
+        library_layout.addWidget(self.heatmap_canvas)
+        layout.addLayout(library_layout)
+
+        self.candidate_slider = QSlider(Qt.Horizontal)
+        self.candidate_slider.setMinimum(0)
+        self.candidate_slider.setMaximum(len(self.library.labels) - 1)
+        self.candidate_slider.valueChanged.connect(self.select_candidate)
+        self.candidate_label = QLabel()
+        layout.addWidget(self.candidate_label)
+        layout.addWidget(self.candidate_slider)
+
+        add_candidate_button = QPushButton("Add Selected Candidate")
+        add_candidate_button.clicked.connect(self.add_candidate_to_main)
+        layout.addWidget(add_candidate_button)
 
         self.setLayout(layout)
 
         # Plot the initial pole-zero and phase response using methods from the main window
         self.plot_pole_zero()
         self.plot_phase_response()
+        self.plot_library()
+        self.select_candidate(0)
+
+    def plot_library(self):
+        """Draw the phase of all candidates as one LineCollection and their group delay as a heatmap."""
+        library = self.library
+        x = library.w / np.pi
+        segments = np.stack([np.broadcast_to(x, library.phase.shape), library.phase], axis=-1)
+        self.overlay_ax.add_collection(LineCollection(segments, colors="lightgray", linewidths=0.5))
+        self.selected_phase_line, = self.overlay_ax.plot([], [], color="red", linewidth=2, animated=True)
+        self.overlay_ax.set_xlim(0, 1)
+        self.overlay_ax.set_ylim(library.phase.min() - 0.2, library.phase.max() + 0.2)
+        self.overlay_ax.set_title("Library Phase (all candidates)")
+        self.overlay_ax.set_xlabel("Normalized Frequency")
+        self.overlay_ax.set_ylabel("Phase (radians)")
+
+        # Clip the color range so a few sharp peaks don't wash out the rest of the heatmap
+        self.heatmap_ax.imshow(library.delay, aspect="auto", origin="lower", extent=[0, 1, -0.5, len(library.labels) - 0.5],
+                               vmin=0, vmax=np.percentile(library.delay, 99), cmap="viridis")
+        self.selected_row_line = self.heatmap_ax.axhline(0, color="red", linewidth=1, animated=True)
+        self.heatmap_ax.set_title("Library Group Delay (samples)")
+        self.heatmap_ax.set_xlabel("Normalized Frequency")
+        self.heatmap_ax.set_ylabel("Candidate")
+
+        # The highlights are animated: full draws (e.g. on resize) refresh the cached backgrounds
+        self.library_backgrounds = {}
+        for canvas, ax, artist in self.library_highlights():
+            canvas.mpl_connect('draw_event', lambda event, canvas=canvas, ax=ax, artist=artist:
+                               self.on_library_draw(canvas, ax, artist))
+            canvas.draw()
+
+    def library_highlights(self):
+        return [
+            (self.overlay_canvas, self.overlay_ax, self.selected_phase_line),
+            (self.heatmap_canvas, self.heatmap_ax, self.selected_row_line),
+        ]
+
+    def on_library_draw(self, canvas, ax, artist):
+        self.library_backgrounds[canvas] = canvas.copy_from_bbox(ax.bbox)
+        ax.draw_artist(artist)
+
+    def select_candidate(self, index):
+        self.selected_candidate = index
+        self.candidate_label.setText(f"Candidate {index}: {self.library.labels[index]}")
+        self.selected_phase_line.set_data(self.library.w / np.pi, self.library.phase[index])
+        self.selected_row_line.set_ydata([index, index])
+
+        # Only the highlight moves: blit it over the cached library background
+        for canvas, ax, artist in self.library_highlights():
+            background = self.library_backgrounds.get(canvas)
+            if background is None:
+                canvas.draw_idle()
+                continue
+            canvas.restore_region(background)
+            ax.draw_artist(artist)
+            canvas.blit(ax.bbox)
+
+    def on_heatmap_click(self, event):
+        if event.inaxes != self.heatmap_ax or event.ydata is None:
+            return
+        self.candidate_slider.setValue(int(round(event.ydata)))
+
+    def add_candidate_to_main(self):
+        if not self.main_window.enable_all_pass_checkbox.isChecked():
+            print("Enable the all-pass filter first.")
+            return
+        poles = self.library.poles[self.selected_candidate]
+        zeros = allpass_roots(poles)
+        self.main_window.save_to_history()
+        self.main_window.poles.extend(poles)
+        self.main_window.zeros.extend(zeros)
+        # Keep the magnitude unchanged, as for the equalizer sections
+        compensation = allpass_gain(poles)
+        self.main_window.gain *= compensation
+        self.main_window.active_all_pass_filters.append({"zeros": list(zeros), "poles": list(poles),
+                                                         "gain": compensation})
+        self.main_window.plot_z_plane()
+        self.main_window.plot_frequency_response()
+        self.main_window.plot_phase_response()
+
+    def selected_filter_roots(self):
+        """Zeros/poles of the preset selected in the main window, or None."""
+        selected_filter = self.main_window.all_pass_combobox.currentText()
+        if selected_filter not in self.main_window.all_pass_filters:
+            return None
+        return self.main_window.all_pass_filters[selected_filter]()
     
     def add_to_main(self):
         # Get the selected filter function
@@ -1166,20 +1824,11 @@ class PreviewWindow(QDialog):
 
 
     def plot_pole_zero(self):
-            # Get the selected filter from the combobox in the main window
-        selected_filter = self.main_window.all_pass_combobox.currentText()
-
-        # Get zeros and poles for the selected filter
-        if selected_filter == 'Default first-order all-pass filter with a real pole at 0.5':
-            zeros, poles = self.main_window.get_butterworth_filter()
-        elif selected_filter == 'Default first-order all-pass filter with a real pole at 0.7':
-            zeros, poles = self.main_window.get_chebyshev_filter()
-        elif selected_filter == 'Default second-order all-pass filter with complex conjugate poles':
-            zeros, poles = self.main_window.get_elliptic_filter()
-        elif selected_filter == 'Default first-order all-pass filter with a real pole at 0.6':
-            zeros, poles = self.main_window.get_bessel_filter()
-        else:
+        # Get zeros and poles for the filter selected in the main window
+        roots = self.selected_filter_roots()
+        if roots is None:
             return  # If no filter is selected, do nothing
+        zeros, poles = roots
 
         # Plot poles and zeros
         self.z_plane_ax.cla()  # Clear previous plots
@@ -1208,23 +1857,14 @@ class PreviewWindow(QDialog):
         self.z_plane_canvas.draw()
 
     def plot_phase_response(self):
-        # Get the selected filter from the combobox in the main window
-        selected_filter = self.main_window.all_pass_combobox.currentText()
-
-        # Get transfer function for the selected filter
-        if selected_filter == 'Default first-order all-pass filter with a real pole at 0.5':
-            b, a = self.main_window.get_butterworth_filter()
-        elif selected_filter == 'Default first-order all-pass filter with a real pole at 0.7':
-            b, a = self.main_window.get_chebyshev_filter()
-        elif selected_filter == 'Default second-order all-pass filter with complex conjugate poles':
-            b, a = self.main_window.get_elliptic_filter()
-        elif selected_filter == 'Default first-order all-pass filter with a real pole at 0.6':
-            b, a = self.main_window.get_bessel_filter()
-        else:
+        # Get zeros and poles for the filter selected in the main window
+        roots = self.selected_filter_roots()
+        if roots is None:
             return  # If no filter is selected, do nothing
+        zeros, poles = roots
 
         # Plot the phase response
-        w, h = freqz_zpk(b, a,1)
+        w, h = freqz_zpk(zeros, poles, 1)
         self.phase_ax.cla()
         self.phase_ax.plot(w, np.angle(h), label="Phase Response")
         
@@ -1235,8 +1875,104 @@ class PreviewWindow(QDialog):
 
         self.phase_canvas.draw()
 
+class FixedPointWindow(QDialog):
+    """Q15/Q31 simulation of the current design as one Direct Form II filter and as a cascade of SOS."""
+    # Longer signals are cut, the recursion is simulated sample by sample
+    MAX_SAMPLES = 20000
+
+    def __init__(self, main_window):
+        super().__init__()
+        self.main_window = main_window
+        self.setWindowTitle("Fixed-Point Simulation")
+        self.setGeometry(150, 150, 900, 700)
+        layout = QVBoxLayout()
+
+        options_layout = QHBoxLayout()
+        self.format_combo = QComboBox()
+        self.format_combo.addItems(list(FORMATS))
+        self.format_combo.currentTextChanged.connect(self.update_accumulator_bits)
+        self.rounding_combo = QComboBox()
+        self.rounding_combo.addItems(["round", "floor"])
+        self.overflow_combo = QComboBox()
+        self.overflow_combo.addItems(["saturate", "wrap"])
+        self.accumulator_spinbox = QSpinBox()
+        self.accumulator_spinbox.setRange(16, 64)
+        self.level_spinbox = QSpinBox()
+        self.level_spinbox.setRange(1, 100)
+        self.level_spinbox.setValue(50)
+        self.level_spinbox.setSuffix(" % full scale")
+        run_button = QPushButton("Simulate")
+        run_button.clicked.connect(self.simulate)
+        for text, widget in [("Format:", self.format_combo), ("Rounding:", self.rounding_combo),
+                             ("Overflow:", self.overflow_combo), ("Accumulator bits:", self.accumulator_spinbox),
+                             ("Input peak:", self.level_spinbox)]:
+            options_layout.addWidget(QLabel(text))
+            options_layout.addWidget(widget)
+        options_layout.addWidget(run_button)
+        layout.addLayout(options_layout)
+
+        self.response_fig, self.response_ax = plt.subplots()
+        self.response_canvas = FigureCanvas(self.response_fig)
+        layout.addWidget(self.response_canvas)
+
+        self.report_label = QLabel()
+        layout.addWidget(self.report_label)
+
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.close)
+        layout.addWidget(close_button)
+        self.setLayout(layout)
+
+        self.update_accumulator_bits(self.format_combo.currentText())
+        self.simulate()
+
+    def update_accumulator_bits(self, name):
+        self.accumulator_spinbox.setValue(FORMATS[name].accumulator_bits)
+
+    def fixed_point_format(self):
+        word_bits = FORMATS[self.format_combo.currentText()].word_bits
+        return FixedPointFormat(word_bits, self.accumulator_spinbox.value(),
+                                self.rounding_combo.currentText(), self.overflow_combo.currentText())
+
+    def simulate(self):
+        """Run both realizations on the loaded signal scaled to the chosen peak and report the results."""
+        fmt = self.fixed_point_format()
+        b, a, sos = self.main_window.fixed_point_coefficients()
+        x = np.asarray(self.main_window.signal[:self.MAX_SAMPLES], dtype=float)
+        peak = np.max(np.abs(x))
+        x = x / peak * self.level_spinbox.value() / 100.0 if peak > 0 else x
+        try:
+            results = {"Direct Form II": simulate_df2(b, a, x, fmt), "Cascade (SOS)": simulate_sos(sos, x, fmt)}
+        except (ValueError, OverflowError) as e:
+            QMessageBox.critical(self, "Error", f"Fixed-point simulation failed: {str(e)}")
+            return
+
+        self.response_ax.cla()
+        ideal = next(iter(results.values()))
+        self.response_ax.plot(ideal.w / np.pi, 20 * np.log10(np.abs(ideal.h_ideal) + 1e-12), 'k', label="Ideal")
+        lines = []
+        for name, result in results.items():
+            self.response_ax.plot(result.w / np.pi, 20 * np.log10(np.abs(result.h_quantized) + 1e-12),
+                                  '--', label=f"{name} (quantized)")
+            overflows = ", ".join(f"{stage} {count}" for stage, count in result.overflows.items())
+            lines.append(f"{name}: SNR {result.snr_db:.1f} dB, overflows: {overflows}")
+        self.response_ax.set_title(f"Q{fmt.word_bits - 1} coefficient quantization")
+        self.response_ax.set_xlabel('Normalized Frequency (×π rad/sample)')
+        self.response_ax.set_ylabel('Magnitude (dB)')
+        self.response_ax.legend(loc='lower left')
+        self.response_canvas.draw()
+        self.report_label.setText("\n".join(lines))
+
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    # SIGUSR1/SIGUSR2 toggle the cProfile/tracemalloc captures (only for the app itself, not for
+    # embedders like the benchmarks). Python only runs signal handlers between bytecodes, so an
+    # idle Qt loop gets woken up now and then
+    profiler.install_signal_handlers()
+    signal_timer = QTimer()
+    signal_timer.timeout.connect(lambda: None)
+    signal_timer.start(500)
     window = FilterDesignApp()
     window.show()
     sys.exit(app.exec_())
@@ -0,0 +1,112 @@
+"""
+Streaming engine that runs the generated C code (c_codegen) natively.
+
+The source is compiled into a shared library with the local C compiler
+(``$CC``, else cc/gcc/clang) and driven through its block API with ctypes.
+NumPy buffers of the matching dtype are passed by pointer, so no samples are
+copied on the way in or out. Integer engines work on Q15/Q31 samples;
+encode/decode convert from and to floats in full-scale units.
+"""
+import ctypes
+import os
+import shutil
+import subprocess
+import tempfile
+
+import numpy as np
+
+from c_codegen import SAMPLE_DTYPES
+
+CFLAGS = ["-O2", "-std=c99"]
+
+
+def find_compiler():
+    compiler = os.environ.get("CC") or shutil.which("cc") or shutil.which("gcc") or shutil.which("clang")
+    if not compiler:
+        raise RuntimeError("No C compiler found (set CC)")
+    return compiler
+
+
+class NativeFilter:
+    """A generated C filter built as a shared library, with the same process/reset API as the Python engines."""
+
+    def __init__(self, source, ctype="double", name="filter", cflags=None):
+        self.dtype = SAMPLE_DTYPES[ctype]
+        # Integer (Q15/Q31) samples are fractions of full scale
+        self.full_scale = 2.0 ** (np.iinfo(self.dtype).bits - 1) if np.issubdtype(self.dtype, np.integer) else None
+        self.directory = tempfile.mkdtemp(prefix="filter_c_")
+        # Every build gets its own path: dlopen hands back an already loaded library of the same name
+        c_file = os.path.join(self.directory, f"{name}.c")
+        library = os.path.join(self.directory, f"{name}.so")
+        with open(c_file, "w") as file:
+            file.write(source)
+        command = [find_compiler(), *(CFLAGS if cflags is None else cflags), "-shared", "-fPIC",
+                   "-o", library, c_file]
+        result = subprocess.run(command, capture_output=True, text=True)
+        if result.returncode != 0:
+            self.close()
+            raise RuntimeError(f"Compilation failed:\n{result.stderr}")
+
+        self.lib = ctypes.CDLL(library)
+        self.process_block = getattr(self.lib, f"{name}_process_block")
+        self.process_block.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_size_t, ctypes.c_void_p]
+        self.process_block.restype = None
+        self.reset_state = getattr(self.lib, f"{name}_reset")
+        self.reset_state.argtypes = [ctypes.c_void_p]
+        self.reset_state.restype = None
+        state_size = getattr(self.lib, f"{name}_state_size")
+        state_size.restype = ctypes.c_size_t
+        self.state = np.zeros(state_size(), dtype=np.uint8)
+        self.reset()
+
+    def reset(self, initial=0.0):
+        """
+        Clear the state, or (float engines) start in the steady state of a
+        constant ``initial`` input. The generated float filters are linear in
+        their state buffer, so that state is found by probing the one-sample
+        state update for every state value.
+        """
+        self.reset_state(self.state.ctypes.data)
+        if initial == 0 or self.full_scale is not None:
+            return
+        values = self.state.view(self.dtype)
+        size = len(values)
+        x, y = np.zeros(1, dtype=self.dtype), np.empty(1, dtype=self.dtype)
+        update = np.empty((size, size))
+        for i in range(size):
+            values[:] = 0
+            values[i] = 1
+            self.process_block(x.ctypes.data, y.ctypes.data, 1, self.state.ctypes.data)
+            update[:, i] = values
+        values[:] = 0
+        x[0] = 1
+        self.process_block(x.ctypes.data, y.ctypes.data, 1, self.state.ctypes.data)
+        step = values.astype(float)
+        values[:] = np.linalg.solve(np.eye(size) - update, step) * initial
+
+    def process(self, x, out=None):
+        """
+        Filter a block. A contiguous ``x`` of the engine's dtype is read in
+        place, and ``out`` (same length and dtype, e.g. a slice of a
+        preallocated output signal) is written in place.
+        """
+        x = np.ascontiguousarray(x, dtype=self.dtype)
+        if out is None:
+            out = np.empty_like(x)
+        elif out.dtype != self.dtype or not out.flags.c_contiguous or len(out) != len(x):
+            raise ValueError("out must be a contiguous array of the engine's dtype and the input's length")
+        self.process_block(x.ctypes.data, out.ctypes.data, len(x), self.state.ctypes.data)
+        return out
+
+    def encode(self, x):
+        """Float samples (full scale +-1 for integer engines) to the engine's dtype, rounded and saturated."""
+        if self.full_scale is None:
+            return np.ascontiguousarray(x, dtype=self.dtype)
+        info = np.iinfo(self.dtype)
+        return np.clip(np.round(np.asarray(x, dtype=float) * self.full_scale), info.min, info.max).astype(self.dtype)
+
+    def decode(self, y):
+        return y / self.full_scale if self.full_scale is not None else y
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
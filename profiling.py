@@ -0,0 +1,164 @@
+"""
+Low-overhead timing spans on the hot paths, plus cProfile/tracemalloc
+captures that can be started and stopped while the app runs.
+
+Functions decorated with ``@span()`` add their wall time to a per-name
+count/total/max table (two perf_counter calls per call; nothing when
+``profiler.enabled`` is off). Hooks added to ``profiler.hooks`` receive
+every (name, seconds) as well.
+
+Captures are written to PROFILE_DIR (default: the working directory):
+``*.prof`` for cProfile (open with ``python -m pstats`` or snakeviz),
+``*.tracemalloc.txt`` with the top allocation sites, and ``*.spans.json``
+for the span table. On POSIX, SIGUSR1 toggles the cProfile capture and
+SIGUSR2 the tracemalloc one, so a running process can be profiled without
+touching the UI:
+
+    kill -USR1 <pid>   # start, and again to stop and dump
+"""
+import cProfile
+import functools
+import json
+import os
+import signal
+import time
+import tracemalloc
+
+PROFILE_DIR = os.environ.get("PROFILE_DIR", ".")
+TRACEMALLOC_FRAMES = 10
+TRACEMALLOC_TOP = 50
+
+
+class Profiler:
+    def __init__(self, directory=PROFILE_DIR):
+        self.directory = directory
+        self.enabled = True
+        self.spans = {}  # name -> [count, total s, max s]
+        self.hooks = []
+        self.cprofile = None
+
+    def record(self, name, seconds):
+        stats = self.spans.get(name)
+        if stats is None:
+            self.spans[name] = [1, seconds, seconds]
+        else:
+            stats[0] += 1
+            stats[1] += seconds
+            if seconds > stats[2]:
+                stats[2] = seconds
+        for hook in self.hooks:
+            hook(name, seconds)
+
+    def reset_spans(self):
+        self.spans = {}
+
+    def span_table(self):
+        """{name: {count, total_s, mean_ms, max_ms}}, slowest total first."""
+        return {name: {"count": count, "total_s": total, "mean_ms": total / count * 1e3, "max_ms": longest * 1e3}
+                for name, (count, total, longest) in sorted(self.spans.items(), key=lambda item: -item[1][1])}
+
+    def summary(self, top=5):
+        lines = [f"{name}: {stats['count']}x, mean {stats['mean_ms']:.2f} ms, max {stats['max_ms']:.1f} ms"
+                 for name, stats in list(self.span_table().items())[:top]]
+        return "\n".join(lines)
+
+    def output_path(self, suffix):
+        os.makedirs(self.directory, exist_ok=True)
+        return os.path.join(self.directory, f"profile-{time.strftime('%Y%m%d-%H%M%S')}{suffix}")
+
+    def dump_spans(self):
+        path = self.output_path(".spans.json")
+        with open(path, "w") as file:
+            json.dump(self.span_table(), file, indent=1)
+        return path
+
+    @property
+    def cprofile_active(self):
+        return self.cprofile is not None
+
+    def start_cprofile(self):
+        if self.cprofile is None:
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+
+    def stop_cprofile(self):
+        """Stop the capture and dump it; returns the file path (None if nothing was running)."""
+        if self.cprofile is None:
+            return None
+        self.cprofile.disable()
+        path = self.output_path(".prof")
+        self.cprofile.dump_stats(path)
+        self.cprofile = None
+        return path
+
+    @property
+    def tracemalloc_active(self):
+        return tracemalloc.is_tracing()
+
+    def start_tracemalloc(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+
+    def stop_tracemalloc(self):
+        """Snapshot the traced allocations, stop tracing and dump the top sites; returns the file path."""
+        if not tracemalloc.is_tracing():
+            return None
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        path = self.output_path(".tracemalloc.txt")
+        with open(path, "w") as file:
+            file.write(f"Traced memory: current {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB\n\n")
+            for statistic in snapshot.statistics("traceback")[:TRACEMALLOC_TOP]:
+                file.write(f"{statistic}\n")
+                file.write("\n".join(f"    {line}" for line in statistic.traceback.format()) + "\n")
+        return path
+
+    def toggle_cprofile(self):
+        if self.cprofile_active:
+            return self.stop_cprofile()
+        self.start_cprofile()
+        return None
+
+    def toggle_tracemalloc(self):
+        if self.tracemalloc_active:
+            return self.stop_tracemalloc()
+        self.start_tracemalloc()
+        return None
+
+    def install_signal_handlers(self):
+        """SIGUSR1 toggles cProfile, SIGUSR2 tracemalloc (POSIX only; a no-op elsewhere)."""
+        if not hasattr(signal, "SIGUSR1"):
+            return
+        for signal_number, toggle, name in [(signal.SIGUSR1, self.toggle_cprofile, "cProfile"),
+                                            (signal.SIGUSR2, self.toggle_tracemalloc, "tracemalloc")]:
+            def handler(signum, frame, toggle=toggle, name=name):
+                # Raising here would surface in whatever frame was interrupted (often a Qt slot)
+                try:
+                    path = toggle()
+                except OSError as e:
+                    print(f"Could not write the {name} capture: {e}")
+                    return
+                print(f"{name} capture written to {path}" if path else f"{name} capture started")
+            signal.signal(signal_number, handler)
+
+
+profiler = Profiler()
+
+
+def span(name=None):
+    """Decorator timing every call of the function into ``profiler`` (under its qualified name by default)."""
+    def decorate(function):
+        label = name or function.__qualname__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profiler.record(label, time.perf_counter() - start)
+        return wrapper
+    return decorate
@@ -0,0 +1,567 @@
+"""
+Filter realizations and the streaming engines that run them.
+
+Every engine keeps its own state between calls of ``process(block)``, so the
+real-time path can feed it one sample or a whole block at a time.
+``reset(initial)`` puts an engine in the steady state of a constant input,
+like ``lfilter_zi * initial`` does for lfilter, so every realization starts
+without the step transient.
+"""
+import timeit
+
+import numpy as np
+from scipy import fft as sp_fft, linalg, signal
+
+
+def normalize_tf(b, a):
+    """Real (b, a) of equal length N + 1 with a[0] == 1."""
+    b = np.atleast_1d(np.asarray(b, dtype=complex))
+    a = np.atleast_1d(np.asarray(a, dtype=complex))
+    # Polynomials expanded from conjugate pairs carry round-off imaginary parts
+    for coefficients in (b, a):
+        if np.max(np.abs(coefficients.imag)) > 1e-9 * max(np.max(np.abs(coefficients.real)), 1e-300):
+            raise ValueError("Realization needs real coefficients (add the missing conjugates)")
+    length = max(len(b), len(a))
+    b = np.pad(b.real, (0, length - len(b)))
+    a = np.pad(a.real, (0, length - len(a)))
+    return b / a[0], a / a[0]
+
+
+def tf2lattice(b, a):
+    """
+    Reflection coefficients k[1..N] and ladder coefficients v[0..N] of the
+    Gray-Markel lattice-ladder realization of b/a (step-down recursion).
+    An all-pass b/a gives v = [0, ..., 0, 1]. The filter is stable iff all |k| < 1.
+    """
+    b, a = normalize_tf(b, a)
+    order = len(a) - 1
+    k = np.zeros(order)
+    v = np.zeros(order + 1)
+    a_m = a.copy()
+    c_m = b.copy()
+    for m in range(order, 0, -1):
+        # Ladder tap from the current numerator, then step the denominator down one order
+        v[m] = c_m[m]
+        c_m = c_m - v[m] * a_m[::-1]
+        k[m - 1] = a_m[m]
+        if abs(k[m - 1]) >= 1:
+            raise ValueError("Lattice realization needs a stable denominator (|k| < 1)")
+        a_m = (a_m - k[m - 1] * a_m[::-1]) / (1 - k[m - 1] ** 2)
+        a_m = a_m[:m]
+        c_m = c_m[:m]
+    v[0] = c_m[0]
+    return k, v
+
+
+class DirectFormFilter:
+    """Direct Form II (transposed, via lfilter) streaming engine."""
+
+    def __init__(self, b, a):
+        self.b, self.a = normalize_tf(b, a)
+        self.reset()
+
+    def reset(self, initial=0.0):
+        self.state = signal.lfilter_zi(self.b, self.a) * initial if len(self.a) > 1 else np.zeros(0)
+
+    def process(self, x):
+        y, self.state = signal.lfilter(self.b, self.a, np.asarray(x, dtype=float), zi=self.state)
+        return y
+
+
+class SosFilter:
+    """Cascade of second-order sections (via sosfilt) streaming engine."""
+
+    def __init__(self, sos):
+        self.sos = np.asarray(sos, dtype=float)
+        self.reset()
+
+    def reset(self, initial=0.0):
+        self.state = signal.sosfilt_zi(self.sos) * initial
+
+    def process(self, x):
+        y, self.state = signal.sosfilt(self.sos, np.asarray(x, dtype=float), zi=self.state)
+        return y
+
+
+class LatticeFilter:
+    """
+    Lattice-ladder streaming engine.
+
+    Per sample, for m = N..1:
+        f[m-1] = f[m] - k[m] g[m-1](n-1)
+        g[m]   = k[m] f[m-1] + g[m-1](n-1)
+    with f[N] = x, g[0] = f[0] and y = sum(v[m] g[m]). The state is g[0..N-1]
+    of the previous sample. For all-pass sections only g[N] is needed.
+    """
+
+    def __init__(self, k, v):
+        self.k = [float(value) for value in k]
+        self.v = [float(value) for value in v]
+        self.allpass = all(value == 0 for value in self.v[:-1])
+        self.reset()
+
+    @classmethod
+    def from_tf(cls, b, a):
+        return cls(*tf2lattice(b, a))
+
+    def reset(self, initial=0.0):
+        # At DC g[m] = x A_m(1) / A_N(1), and the step-up recursion gives A_m(1) = prod(1 + k[1..m])
+        self.state = [float(initial / np.prod(1 + np.array(self.k[m:]))) for m in range(len(self.k))]
+
+    def process(self, x):
+        k, v, previous = self.k, self.v, self.state
+        order = len(k)
+        y = np.empty(len(x))
+        g = [0.0] * (order + 1)
+        for n, sample in enumerate(np.asarray(x, dtype=float)):
+            f = float(sample)
+            for m in range(order, 0, -1):
+                f -= k[m - 1] * previous[m - 1]
+                g[m] = k[m - 1] * f + previous[m - 1]
+            g[0] = f
+            if self.allpass:
+                y[n] = v[order] * g[order]
+            else:
+                y[n] = sum(v_m * g_m for v_m, g_m in zip(v, g))
+            previous = g[:order]
+        self.state = previous
+        return y
+
+
+def parallel_sections(residues, poles, tol=1e-9):
+    """
+    (S, 5) rows [b0, b1, 1, a1, a2] of the partial fractions r / (1 - p z^-1):
+    one real second-order section per conjugate pole pair and a first-order one
+    (b1 = a2 = 0) per real pole.
+    """
+    if len(poles) > 1:
+        distances = np.abs(poles[:, np.newaxis] - poles[np.newaxis, :]) + np.eye(len(poles))
+        if np.min(distances) < 1e-6:
+            raise ValueError("Parallel realization needs distinct poles")
+
+    sections = []
+    upper = poles.imag > tol
+    if np.count_nonzero(upper) != np.count_nonzero(poles.imag < -tol):
+        raise ValueError("Parallel realization needs real coefficients (add the missing conjugates)")
+    # A conjugate pair r/(1 - p z^-1) + conj(r)/(1 - conj(p) z^-1) is one real biquad
+    for r, p in zip(residues[upper], poles[upper]):
+        sections.append([2 * r.real, -2 * (r * np.conj(p)).real, 1.0, -2 * p.real, abs(p) ** 2])
+    real = np.abs(poles.imag) <= tol
+    for r, p in zip(residues[real], poles[real]):
+        sections.append([r.real, 0.0, 1.0, -p.real, 0.0])
+    return np.array(sections, dtype=float).reshape(-1, 5)
+
+
+def parallel_response(sections, fir, w):
+    """Frequency response of the parallel form (sections, fir) at the frequencies ``w``."""
+    u = np.exp(-1j * np.asarray(w))
+    h = np.polyval(np.asarray(fir)[::-1], u) if len(fir) else np.zeros(len(u), dtype=complex)
+    for b0, b1, a0, a1, a2 in sections:
+        h = h + (b0 + b1 * u) / (a0 + (a1 + a2 * u) * u)
+    return h
+
+
+def tf2parallel(b, a, tol=1e-9, worN=512):
+    """
+    Parallel form of b/a from the partial fractions of ``residuez``.
+
+    Returns (sections, fir): ``sections`` is an (S, 5) array of rows
+    [b0, b1, 1, a1, a2] (see parallel_sections) and ``fir`` the direct
+    polynomial in z^-1. The output is fir(x) plus the sum of all section outputs.
+    residuez loses clustered poles, so the response of the result is compared
+    with that of b/a on ``worN`` frequencies and a mismatch raises ValueError;
+    zpk2parallel works from the roots instead.
+    """
+    b, a = normalize_tf(b, a)
+    a = np.trim_zeros(a, 'b')
+    residues, poles, fir = signal.residuez(b, a)
+    sections = parallel_sections(residues, poles, tol)
+    fir = np.real(np.atleast_1d(fir)).astype(float)
+
+    w, h = signal.freqz(b, a, worN)
+    if not np.max(np.abs(parallel_response(sections, fir, w) - h)) <= 1e-4 * np.max(np.abs(h)):
+        raise ValueError("Parallel realization of b/a is ill-conditioned (partial fractions miss the response)")
+    return sections, fir
+
+
+def zpk2parallel(z, p, k, tol=1e-9):
+    """
+    Parallel form (sections, fir) of the design from its roots, as in
+    tf2parallel. Roots at the origin are delays and drop out; the residues
+        r_j = k prod_i(1 - z_i / p_j) / prod_{l != j}(1 - p_l / p_j)
+    and the FIR part fir[n] = h[n] - sum_j r_j p_j^n (n up to the number of
+    zeros minus poles) never expand the polynomials, so clustered poles keep
+    their accuracy.
+    """
+    z = np.atleast_1d(np.asarray(z, dtype=complex))
+    p = np.atleast_1d(np.asarray(p, dtype=complex))
+    z, p = z[z != 0], p[p != 0]
+    residues = np.array([k * np.prod(1 - z / pole) / np.prod(1 - np.delete(p, j) / pole)
+                         for j, pole in enumerate(p)], dtype=complex)
+    sections = parallel_sections(residues, p, tol)
+
+    length = len(z) - len(p) + 1
+    if length <= 0:
+        return sections, np.zeros(0)
+    impulse = np.zeros(length)
+    impulse[0] = 1.0
+    h = signal.sosfilt(signal.zpk2sos(z, p, k), impulse)
+    fir = h - np.real(np.sum(residues[:, np.newaxis] * p[:, np.newaxis] ** np.arange(length), axis=0))
+    return sections, fir
+
+
+class ParallelFilter:
+    """
+    Parallel-form streaming engine.
+
+    The sections are independent, so their states live in (S,) arrays and each
+    sample advances every section at once (transposed direct form II per
+    section). Long blocks instead run each section through lfilter, which keeps
+    the per-sample loop in C; both paths share the same state.
+    """
+
+    # Blocks longer than this use one lfilter call per section
+    VECTOR_BLOCK = 16
+
+    def __init__(self, sections, fir):
+        sections = np.asarray(sections, dtype=float).reshape(-1, 5)
+        self.b0, self.b1 = sections[:, 0], sections[:, 1]
+        self.a1, self.a2 = sections[:, 3], sections[:, 4]
+        self.fir = np.atleast_1d(np.asarray(fir, dtype=float))
+        self.reset()
+
+    @classmethod
+    def from_zpk(cls, z, p, k):
+        return cls(*zpk2parallel(z, p, k))
+
+    @classmethod
+    def from_tf(cls, b, a):
+        return cls(*tf2parallel(b, a))
+
+    def reset(self, initial=0.0):
+        # Section s at DC: output v = x H_s(1), then z2 = -a2 v and z1 = b1 x - a1 v + z2
+        v = initial * (self.b0 + self.b1) / (1 + self.a1 + self.a2)
+        self.z2 = -self.a2 * v
+        self.z1 = self.b1 * initial - self.a1 * v + self.z2
+        self.fir_state = signal.lfilter_zi(self.fir, [1.0]) * initial if len(self.fir) > 1 else np.zeros(0)
+
+    def process(self, x):
+        x = np.asarray(x, dtype=float)
+        if len(self.fir) > 1:
+            y, self.fir_state = signal.lfilter(self.fir, [1.0], x, zi=self.fir_state)
+        else:
+            y = self.fir[0] * x if len(self.fir) else np.zeros(len(x))
+
+        if len(x) <= self.VECTOR_BLOCK:
+            b0, b1, a1, a2, z1, z2 = self.b0, self.b1, self.a1, self.a2, self.z1, self.z2
+            for n, sample in enumerate(x):
+                outputs = b0 * sample + z1
+                z1 = b1 * sample - a1 * outputs + z2
+                z2 = -a2 * outputs
+                y[n] += outputs.sum()
+            self.z1, self.z2 = z1, z2
+        else:
+            for s in range(len(self.b0)):
+                section_y, state = signal.lfilter([self.b0[s], self.b1[s], 0.0], [1.0, self.a1[s], self.a2[s]],
+                                                  x, zi=[self.z1[s], self.z2[s]])
+                self.z1[s], self.z2[s] = state
+                y += section_y
+        return y
+
+
+def modal_form(A, B, C, D, tol=1e-9):
+    """
+    Real modal (block-diagonal) form: one 1x1 block per real pole and a
+    [[sigma, omega], [-omega, sigma]] block per conjugate pair. Needs
+    distinct poles, otherwise A is not diagonalizable.
+    """
+    eigenvalues, vectors = np.linalg.eig(A)
+    columns = []
+    for value, vector in zip(eigenvalues, vectors.T):
+        if value.imag > tol:
+            columns.extend([vector.real, vector.imag])
+        elif abs(value.imag) <= tol:
+            # Rotate the (possibly complex-scaled) eigenvector back onto the reals
+            vector = vector * np.exp(-1j * np.angle(vector[np.argmax(np.abs(vector))]))
+            columns.append(vector.real)
+    T = np.array(columns).T.reshape(len(A), -1)
+    if T.shape[1] != len(A) or np.linalg.cond(T) > 1e12:
+        raise ValueError("Modal form needs distinct poles")
+    T_inv = np.linalg.inv(T)
+    return T_inv @ A @ T, T_inv @ B, C @ T, D
+
+
+def balanced_form(A, B, C, D):
+    """
+    Balanced form (square-root method): the controllability and observability
+    Gramians become equal and diagonal, which keeps the state well scaled for
+    high orders. Needs a stable, minimal system.
+    """
+    try:
+        Wc = linalg.solve_discrete_lyapunov(A, B @ B.T)
+        Wo = linalg.solve_discrete_lyapunov(A.T, C.T @ C)
+        Lc = linalg.cholesky(Wc, lower=True)
+        Lo = linalg.cholesky(Wo, lower=True)
+    except (linalg.LinAlgError, ValueError) as e:
+        raise ValueError(f"Balanced form needs a stable, minimal system ({e})")
+    U, hankel, Vt = linalg.svd(Lo.T @ Lc)
+    scale = np.diag(hankel ** -0.5)
+    T = Lc @ Vt.T @ scale
+    T_inv = scale @ U.T @ Lo.T
+    return T_inv @ A @ T, T_inv @ B, C @ T, D
+
+
+STATE_SPACE_FORMS = {
+    "controllable": lambda A, B, C, D: (A, B, C, D),
+    "modal": modal_form,
+    "balanced": balanced_form,
+}
+
+
+def sos2statespace(sos):
+    """
+    (A, B, C, D) of the sections in series. Each section is realized on its
+    own (dropping the unused second-order terms of first-order sections, so
+    the result stays minimal), and section i + 1 is driven by section i:
+        A = [[A_i, 0], [B_i+1 C_i, A_i+1]]   B = [B_i; B_i+1 D_i]
+        C = [D_i+1 C_i, C_i+1]               D = D_i+1 D_i
+    """
+    A, B, C, D = np.zeros((0, 0)), np.zeros((0, 1)), np.zeros((1, 0)), np.ones((1, 1))
+    for row in np.asarray(sos, dtype=float):
+        b, a = row[:3], row[3:]
+        order = 2 if b[2] or a[2] else 1 if b[1] or a[1] else 0
+        if order == 0:
+            C, D = C * b[0] / a[0], D * b[0] / a[0]
+            continue
+        Ai, Bi, Ci, Di = signal.tf2ss(b[:order + 1], a[:order + 1])
+        A = np.block([[A, np.zeros((len(A), order))], [Bi @ C, Ai]])
+        B = np.vstack([B, Bi @ D])
+        C = np.hstack([Di @ C, Ci])
+        D = Di @ D
+    return A, B, C, D
+
+
+def zpk2statespace(z, p, k, form="controllable"):
+    """
+    (A, B, C, D) of the design in controllable, modal or balanced form. The
+    controllable form is the companion form of the expanded b/a; the modal and
+    balanced forms are transformed from the sections of the roots, which keeps
+    clustered poles accurate.
+    """
+    if form == "controllable":
+        return tf2statespace(*signal.zpk2tf(z, p, k), form)
+    return STATE_SPACE_FORMS[form](*sos2statespace(signal.zpk2sos(z, p, k)))
+
+
+def tf2statespace(b, a, form="controllable"):
+    """Same as zpk2statespace, starting from the transfer function coefficients."""
+    b, a = normalize_tf(b, a)
+    return STATE_SPACE_FORMS[form](*signal.tf2ss(b, a))
+
+
+class StateSpaceFilter:
+    """
+    State-space streaming engine that advances a whole block at once.
+
+    For a block of length L starting from state x0:
+        y = O x0 + h * u          O[n] = C A^n, h = [D, CB, CAB, ...]
+        x_L = A^L x0 + K u        K[:, m] = A^(L-1-m) B
+    The matrices are built from the powers of A once per block length and
+    cached, so a block costs a few matrix products instead of L Python steps.
+    """
+
+    def __init__(self, A, B, C, D, block_size=64):
+        self.A = np.atleast_2d(np.asarray(A, dtype=float))
+        self.B = np.asarray(B, dtype=float).reshape(len(self.A), 1)
+        self.C = np.asarray(C, dtype=float).reshape(1, len(self.A))
+        self.D = float(np.ravel(D)[0]) if np.size(D) else 0.0
+        self.block_size = block_size
+        self.blocks = {}
+        self.reset()
+
+    @classmethod
+    def from_zpk(cls, z, p, k, form="controllable", **options):
+        return cls(*zpk2statespace(z, p, k, form), **options)
+
+    @classmethod
+    def from_tf(cls, b, a, form="controllable", **options):
+        return cls(*tf2statespace(b, a, form), **options)
+
+    def reset(self, initial=0.0):
+        self.state = np.linalg.solve(np.eye(len(self.A)) - self.A, self.B).ravel() * initial
+
+    def block_matrices(self, length):
+        matrices = self.blocks.get(length)
+        if matrices is None:
+            order = len(self.A)
+            powers = np.empty((length + 1, order, order))
+            powers[0] = np.eye(order)
+            for n in range(1, length + 1):
+                powers[n] = powers[n - 1] @ self.A
+            observability = (self.C @ powers[:length]).reshape(length, order)
+            impulse = np.concatenate([[self.D], (self.C @ powers[:length - 1] @ self.B).ravel()])
+            controllability = (powers[length - 1::-1] @ self.B).reshape(length, order).T
+            matrices = (observability, impulse, powers[length], controllability)
+            self.blocks[length] = matrices
+        return matrices
+
+    def process(self, x):
+        x = np.asarray(x, dtype=float)
+        y = np.empty(len(x))
+        for start in range(0, len(x), self.block_size):
+            u = x[start:start + self.block_size]
+            observability, impulse, power, controllability = self.block_matrices(len(u))
+            y[start:start + len(u)] = observability @ self.state + np.convolve(u, impulse)[:len(u)]
+            self.state = power @ self.state + controllability @ u
+        return y
+
+
+def is_fir(a, tol=1e-12):
+    """True when the denominator is trivial, i.e. all poles sit at the origin."""
+    a = np.atleast_1d(np.real_if_close(np.asarray(a)))
+    return np.all(np.abs(a[1:]) <= tol * abs(a[0]))
+
+
+class FftFilter:
+    """
+    FIR streaming engine with overlap-save FFT block convolution.
+
+    The state is the last N - 1 inputs. Blocks are cut into frames overlapping
+    by N - 1, all frames are transformed in one batched rfft and multiplied with
+    the spectrum of the taps (cached per FFT size, which follows the block
+    length up to ``max_step`` new samples per frame). Calls shorter than
+    ``direct_block`` samples (the per-sample real-time path) are a dot product
+    with the history instead.
+    """
+
+    def __init__(self, taps, max_step=None, direct_block=16):
+        self.taps = np.atleast_1d(np.asarray(taps, dtype=float))
+        self.max_step = max_step or max(4 * len(self.taps), 1024)
+        self.direct_block = direct_block
+        self.spectra = {}
+        self.reset()
+
+    @classmethod
+    def from_tf(cls, b, a, **options):
+        b, a = normalize_tf(b, a)
+        if not is_fir(a):
+            raise ValueError("FFT engine needs an FIR design (no poles outside the origin)")
+        return cls(np.trim_zeros(b, 'b'), **options)
+
+    def reset(self, initial=0.0):
+        """Clear the history, or fill it with a constant input (the steady state for that input)."""
+        self.history = np.full(len(self.taps) - 1, float(initial))
+
+    def spectrum(self, fft_size):
+        spectrum = self.spectra.get(fft_size)
+        if spectrum is None:
+            spectrum = self.spectra[fft_size] = sp_fft.rfft(self.taps, fft_size)
+        return spectrum
+
+    def process(self, x):
+        x = np.asarray(x, dtype=float)
+        buffer = np.concatenate([self.history, x])
+        overlap = len(self.taps) - 1
+        self.history = buffer[len(buffer) - overlap:] if overlap else buffer[:0]
+        if len(x) < self.direct_block:
+            return np.convolve(buffer, self.taps, mode='valid')
+
+        fft_size = sp_fft.next_fast_len(overlap + min(len(x), self.max_step), real=True)
+        step = fft_size - overlap
+        frames = -(-len(x) // step)
+        padded = np.pad(buffer, (0, frames * step + overlap - len(buffer)))
+        frame_data = padded[np.arange(frames)[:, np.newaxis] * step + np.arange(fft_size)]
+        y = sp_fft.irfft(sp_fft.rfft(frame_data, axis=1) * self.spectrum(fft_size), fft_size, axis=1)
+        return y[:, overlap:].ravel()[:len(x)]
+
+
+def measure_fft_crossover(block=4096, tap_counts=(16, 32, 64, 128, 256, 512, 1024, 2048, 4096), repeats=3):
+    """
+    Smallest tap count for which FftFilter beats lfilter on ``block``-sample
+    calls on this machine (the last count if it never does).
+    """
+    rng = np.random.default_rng(0)
+    x = rng.standard_normal(block)
+    for taps in tap_counts:
+        b = rng.standard_normal(taps)
+        fft_engine = FftFilter(b)
+        state = np.zeros(taps - 1)
+        direct = min(timeit.repeat(lambda: signal.lfilter(b, [1.0], x, zi=state), number=1, repeat=repeats))
+        fft = min(timeit.repeat(lambda: fft_engine.process(x), number=1, repeat=repeats))
+        if fft < direct:
+            return taps
+    return tap_counts[-1]
+
+
+# Realizations the real-time filtering can run, as listed in the app
+ENGINE_NAMES = ["Direct Form II", "Cascade (SOS)", "Lattice", "Parallel", "State Space (Modal)",
+                "State Space (Balanced)", "Native C (Cascade)", "Native C (Parallel)"]
+
+
+def impulse_response(b, a, zpk, length=1024):
+    """
+    First ``length`` samples of the design's impulse response: the exact taps
+    of an FIR, otherwise the cascade built from the roots, which stays accurate
+    where the expanded b/a has lost the clustered poles.
+    """
+    impulse = np.zeros(length)
+    impulse[0] = 1.0
+    if is_fir(a):
+        return signal.lfilter(*normalize_tf(b, a), impulse)
+    return signal.sosfilt(signal.zpk2sos(*zpk), impulse)
+
+
+def design_parallel(b, a, zpk):
+    """Parallel form of a design: from the exact taps of an FIR, otherwise from the roots ``zpk``."""
+    return tf2parallel(b, a) if is_fir(a) else zpk2parallel(*zpk)
+
+
+def check_engine(engine, reference, tol=1e-4):
+    """
+    Return ``engine`` (reset) if its impulse response matches ``reference`` to
+    ``tol`` of the peak, otherwise raise ValueError: a realization computed from
+    ill-conditioned coefficients can be stable and still filter the wrong thing.
+    """
+    impulse = np.zeros(len(reference))
+    impulse[0] = 1.0
+    engine.reset()
+    error = np.max(np.abs(engine.process(impulse) - reference))
+    engine.reset()
+    if not error <= tol * np.max(np.abs(reference)):
+        raise ValueError(f"Realization doesn't reproduce the design (impulse response off by {error:.3g})")
+    return engine
+
+
+def make_engine(name, b, a, zpk, fft_crossover, native=None):
+    """
+    Streaming engine of realization ``name`` for the design b/a with roots
+    ``zpk`` = (zeros, poles, gain), or None for plain Direct Form II, which the
+    app runs as one lfilter call per point. FIRs with at least ``fft_crossover``
+    taps run Direct Form II on FftFilter instead. ``native(structure)`` builds
+    the NativeFilter of "Cascade (SOS)" or "Parallel" for the Native C engines
+    (this module doesn't compile C). Every other engine is checked against the
+    impulse response of the design and rejected with ValueError if it is off.
+    """
+    if name == "Direct Form II":
+        return FftFilter.from_tf(b, a) if is_fir(a) and len(b) >= fft_crossover else None
+    if name == "Cascade (SOS)":
+        engine = SosFilter(signal.zpk2sos(*zpk))
+    elif name == "Lattice":
+        engine = LatticeFilter.from_tf(b, a)
+    elif name == "Parallel":
+        engine = ParallelFilter(*design_parallel(b, a, zpk))
+    elif name.startswith("State Space"):
+        form = "modal" if "Modal" in name else "balanced"
+        engine = StateSpaceFilter.from_tf(b, a, form) if is_fir(a) else StateSpaceFilter.from_zpk(*zpk, form)
+    elif name.startswith("Native C"):
+        if native is None:
+            raise ValueError("Native engines need a compiler callback")
+        engine = native("Parallel" if "Parallel" in name else "Cascade (SOS)")
+    else:
+        raise ValueError(f"Unknown engine: {name}")
+    try:
+        return check_engine(engine, impulse_response(b, a, zpk))
+    except ValueError:
+        if hasattr(engine, "close"):
+            engine.close()
+        raise
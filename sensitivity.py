@@ -0,0 +1,192 @@
+"""
+Monte-Carlo coefficient sensitivity of the Direct Form II, cascade (SOS),
+lattice and parallel realizations.
+
+Every realized coefficient that is not exactly representable in the word
+gets a uniform error of up to half an LSB, independently in every trial;
+each coefficient set (b or a of the filter or of a section, the reflection or
+ladder coefficients) is scaled to fill the word. All trials of a
+realization are evaluated at once: the frequency responses as matrix
+products with a shared exp(-jwn) table, and the poles from batched companion
+eigenvalues (closed-form roots for second-order sections).
+"""
+from collections import namedtuple
+
+import numpy as np
+from scipy import signal
+
+from realizations import is_fir, normalize_tf, tf2lattice, tf2parallel
+
+SensitivityResult = namedtuple("SensitivityResult", [
+    "unstable_fraction", "max_pole_radius", "ripple_deviation_db", "attenuation_loss_db", "passband_deviation_db",
+])
+SensitivityResult.__doc__ = """
+Fraction of trials with a pole on or outside the unit circle and the largest
+pole radius seen; over the stable trials, the worst change of the passband
+ripple, the worst loss of stopband attenuation (positive = less attenuation)
+and the worst magnitude deviation in the passband, all in dB.
+"""
+
+
+def perturb(values, word_bits, trials, rng):
+    """
+    ``trials`` copies of ``values`` with uniform +-LSB/2 errors on the
+    coefficients the word can't hold exactly. The LSB is relative to the
+    largest coefficient of the set, so a tiny overall gain costs no precision.
+    """
+    values = np.asarray(values, dtype=float)
+    peak = np.max(np.abs(values)) if values.size else 0.0
+    if peak == 0:
+        return np.broadcast_to(values, (trials,) + values.shape).copy()
+    scale = 2.0 ** (word_bits - 1 - (int(np.floor(np.log2(peak))) + 1))
+    inexact = values * scale != np.round(values * scale)
+    noise = rng.uniform(-0.5, 0.5, (trials,) + values.shape) / scale
+    return values + noise * inexact
+
+
+def polynomial_response(coefficients, w):
+    """Responses of the polynomials in z^-1 (one per row) on ``w``."""
+    powers = np.exp(-1j * np.outer(np.arange(coefficients.shape[-1]), w))
+    return coefficients @ powers
+
+
+def max_pole_radius(a):
+    """Largest pole radius of every denominator row (a[:, 0] == 1)."""
+    order = a.shape[-1] - 1
+    if order == 0:
+        return np.zeros(len(a))
+    companion = np.zeros((len(a), order, order))
+    companion[:, 0, :] = -a[:, 1:]
+    companion[:, np.arange(1, order), np.arange(order - 1)] = 1.0
+    return np.max(np.abs(np.linalg.eigvals(companion)), axis=-1)
+
+
+def quadratic_pole_radius(a1, a2):
+    """Largest root radius of z^2 + a1 z + a2, elementwise."""
+    root = np.sqrt(a1.astype(complex) ** 2 - 4 * a2)
+    return np.maximum(np.abs(-a1 + root), np.abs(-a1 - root)) / 2
+
+
+def lattice2tf(k, v):
+    """(b, a) rows from lattice rows ``k`` (trials, N) and ladder rows ``v`` (trials, N + 1) (step-up recursion)."""
+    trials, order = k.shape
+    a = np.zeros((trials, order + 1))
+    a[:, 0] = 1.0
+    b = v[:, :1] * a[:, :1]
+    b = np.pad(b, ((0, 0), (0, order)))
+    for m in range(1, order + 1):
+        a[:, :m + 1] = a[:, :m + 1] + k[:, m - 1:m] * a[:, m::-1]
+        b[:, :m + 1] += v[:, m:m + 1] * a[:, m::-1]
+    return b, a
+
+
+def direct_form_trials(b, a, word_bits, trials, rng, w):
+    b, a = normalize_tf(b, a)
+    b_trials = perturb(b, word_bits, trials, rng)
+    a_trials = perturb(a, word_bits, trials, rng)
+    radius = np.zeros(trials) if is_fir(a) else max_pole_radius(a_trials)
+    return polynomial_response(b_trials, w) / polynomial_response(a_trials, w), radius
+
+
+def sos_trials(sos, word_bits, trials, rng, w):
+    sos = np.atleast_2d(np.asarray(sos, dtype=float))
+    h = np.ones((trials, len(w)), dtype=complex)
+    radius = np.zeros(trials)
+    for row in sos / sos[:, 3:4]:
+        b_trials = perturb(row[:3], word_bits, trials, rng)
+        a_trials = perturb(row[3:], word_bits, trials, rng)
+        h *= polynomial_response(b_trials, w) / polynomial_response(a_trials, w)
+        radius = np.maximum(radius, quadratic_pole_radius(a_trials[:, 1], a_trials[:, 2]))
+    return h, radius
+
+
+def lattice_trials(b, a, word_bits, trials, rng, w):
+    k, v = tf2lattice(b, a)
+    if len(k) == 0:
+        return direct_form_trials(b, a, word_bits, trials, rng, w)
+    k_trials = perturb(k, word_bits, trials, rng)
+    b_trials, a_trials = lattice2tf(k_trials, perturb(v, word_bits, trials, rng))
+    # The lattice is stable exactly when every |k| < 1; the radius is for reporting
+    radius = np.zeros(trials) if is_fir(a) else max_pole_radius(a_trials)
+    radius[np.any(np.abs(k_trials) >= 1, axis=1)] = np.maximum(radius, 1.0)[np.any(np.abs(k_trials) >= 1, axis=1)]
+    return polynomial_response(b_trials, w) / polynomial_response(a_trials, w), radius
+
+
+def parallel_trials(b, a, word_bits, trials, rng, w):
+    sections, fir = tf2parallel(b, a)
+    h = polynomial_response(perturb(fir, word_bits, trials, rng), w) if len(fir) else np.zeros((trials, len(w)))
+    radius = np.zeros(trials)
+    for row in sections:
+        numerator = perturb(row[:2], word_bits, trials, rng)
+        a_trials = perturb(row[2:], word_bits, trials, rng)
+        h = h + polynomial_response(numerator, w) / polynomial_response(a_trials, w)
+        radius = np.maximum(radius, quadratic_pole_radius(a_trials[:, 1], a_trials[:, 2]))
+    return h, radius
+
+
+def band_metrics(magnitude_db, passband, stopband):
+    """(ripple, attenuation) in dB of every row; attenuation is nan without a stopband."""
+    passband_db = magnitude_db[..., passband]
+    ripple = np.max(passband_db, axis=-1) - np.min(passband_db, axis=-1)
+    if not np.any(stopband):
+        return ripple, np.full(ripple.shape, np.nan)
+    attenuation = np.max(passband_db, axis=-1) - np.max(magnitude_db[..., stopband], axis=-1)
+    return ripple, attenuation
+
+
+def coefficient_sensitivity(b, a, sos=None, word_bits=16, trials=2000, worN=512, stopband_db=20.0, seed=0):
+    """
+    Monte-Carlo sensitivity of every realization of b/a (``sos`` defaults to
+    tf2sos) to ``word_bits``-bit coefficients, as {realization: SensitivityResult}.
+    The passband is where the ideal magnitude is within 3 dB of its peak, the
+    stopband where it is at least ``stopband_db`` below it. Realizations that
+    don't exist for the design (an unstable lattice, repeated poles for the
+    parallel form) are left out.
+    """
+    b, a = normalize_tf(b, a)
+    sos = signal.tf2sos(b, a) if sos is None else sos
+    rng = np.random.default_rng(seed)
+    w = np.linspace(0, np.pi, worN, endpoint=False)
+    with np.errstate(divide='ignore'):
+        ideal_db = 20 * np.log10(np.abs(signal.freqz(b, a, worN=w)[1]))
+    peak = np.max(ideal_db[np.isfinite(ideal_db)])
+    passband = ideal_db >= peak - 3
+    stopband = ideal_db <= peak - stopband_db
+    ideal_ripple, ideal_attenuation = band_metrics(ideal_db, passband, stopband)
+
+    realizations = {
+        "Direct Form II": lambda: direct_form_trials(b, a, word_bits, trials, rng, w),
+        "Cascade (SOS)": lambda: sos_trials(sos, word_bits, trials, rng, w),
+        "Lattice": lambda: lattice_trials(b, a, word_bits, trials, rng, w),
+        "Parallel": lambda: parallel_trials(b, a, word_bits, trials, rng, w),
+    }
+    results = {}
+    for name, run in realizations.items():
+        try:
+            h, radius = run()
+        except ValueError as e:
+            print(f"{name} sensitivity skipped: {e}")
+            continue
+        stable = radius < 1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            magnitude_db = 20 * np.log10(np.abs(h[stable]))
+        if np.any(stable):
+            ripple, attenuation = band_metrics(magnitude_db, passband, stopband)
+            deviation = np.abs(magnitude_db[:, passband] - ideal_db[passband])
+            worst = (float(np.max(np.abs(ripple - ideal_ripple))),
+                     float(np.max(ideal_attenuation - attenuation)),
+                     float(np.max(deviation)))
+        else:
+            worst = (np.inf, np.inf, np.inf)
+        results[name] = SensitivityResult(float(np.mean(~stable)), float(np.max(radius)), *worst)
+    return results
+
+
+def format_sensitivity(results, word_bits):
+    lines = [f"{word_bits}-bit coefficients",
+             f"{'realization':<16} {'unstable':>9} {'max |p|':>9} {'ripple dB':>10} {'atten dB':>9} {'passband dB':>12}"]
+    for name, result in results.items():
+        lines.append(f"{name:<16} {result.unstable_fraction:>9.1%} {result.max_pole_radius:>9.5f} "
+                     f"{result.ripple_deviation_db:>10.3g} {result.attenuation_loss_db:>9.3g} "
+                     f"{result.passband_deviation_db:>12.3g}")
+    return "\n".join(lines)